@@ -5,7 +5,7 @@ from complaints.models import Complaint
 class ComplaintCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Complaint
-        fields = ['id', 'image', 'public', 'location', 'title', 'description', 'predicted_severity', 'confidence', 'generated_text']
+        fields = ['id', 'image', 'public', 'location', 'title', 'description', 'predicted_severity', 'confidence', 'generated_text', 'model_version']
         read_only_fields = ['id']
 
 
@@ -13,13 +13,28 @@ class AnalyzeResponseSerializer(serializers.Serializer):
     severity = serializers.ChoiceField(choices=[('good','good'),('minor','minor'),('moderate','moderate'),('severe','severe')])
     confidence = serializers.FloatField()
     generated_text = serializers.CharField()
+    model_version = serializers.CharField(allow_blank=True)
 
 
 # New serializers for simple upload/post endpoints
 class UploadComplaintSerializer(serializers.Serializer):
-    image = serializers.ImageField()
+    image = serializers.ImageField(required=False)
+    upload_session = serializers.UUIDField(required=False)
     username = serializers.CharField()
 
+    def validate(self, attrs):
+        if bool(attrs.get('image')) == bool(attrs.get('upload_session')):
+            raise serializers.ValidationError('Send either image or upload_session.')
+        return attrs
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+    content_type = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
 
 class UploadComplaintResponseSerializer(serializers.Serializer):
     upload_id = serializers.IntegerField()
@@ -1,18 +1,30 @@
 from django.urls import path
 from .views import (
     AnalyzeView,
+    AnalyzeJobView,
+    analyze_job_events_view,
     ComplaintCreateView,
     UploadComplaintView,
+    UploadSessionCreateView,
+    UploadSessionView,
     PostComplaintView,
     test_connection,
+    readiness_view,
+    metrics_view,
 )
 
 # Single urlpatterns list that includes ALL API endpoints
 urlpatterns = [
     path('test/', test_connection, name='test_connection'),
+    path('health/ready', readiness_view, name='api_health_ready'),
+    path('metrics', metrics_view, name='api_metrics'),
     path('analyze/', AnalyzeView.as_view(), name='api_analyze'),
+    path('analyze/jobs/<str:job_id>/', AnalyzeJobView.as_view(), name='api_analyze_job'),
+    path('analyze/jobs/<str:job_id>/events/', analyze_job_events_view, name='api_analyze_job_events'),
     path('complaints/', ComplaintCreateView.as_view(), name='api_complaint_create'),
     path('upload_complaint/', UploadComplaintView.as_view(), name='api_upload_complaint'),
+    path('upload_complaint/sessions/', UploadSessionCreateView.as_view(), name='api_upload_session_create'),
+    path('upload_complaint/sessions/<uuid:session_id>/', UploadSessionView.as_view(), name='api_upload_session'),
     path('post_complaint/', PostComplaintView.as_view(), name='api_post_complaint'),
     
 ]
\ No newline at end of file
@@ -1,11 +1,24 @@
+import secrets
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, parsers
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from complaints.models import Complaint
-from complaints.views import _save_to_mongo
-from complaints.services import predict_and_generate_text
+from complaints.models import Complaint, UploadSession
+from complaints.mongo import mirror_to_gridfs
+from complaints.services import analyze_image, read_image_bytes, readiness, start_warm_up
+from complaints.metrics import render_prometheus, stage_timer
+from complaints.jobs import (
+    JobQueueFull, aget_job, get_job, iter_job_events, job_links, public_fields, stream_job_events, submit_analysis,
+)
+from complaints.uploads import OffsetMismatch, UploadError, append_chunk, completed_upload, create_session
 
 User = get_user_model()
 
@@ -14,6 +27,7 @@ from .serializers import (
     AnalyzeResponseSerializer,
     UploadComplaintSerializer,
     UploadComplaintResponseSerializer,
+    UploadSessionCreateSerializer,
     PostComplaintSerializer,
     PostComplaintResponseSerializer,
 )
@@ -29,20 +43,51 @@ class AnalyzeView(APIView):
         if not uploaded:
             return Response({'detail': 'image is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Save to a temporary path via default storage
-        from django.core.files.storage import default_storage
-        temp_path = default_storage.save(f'temp/{uploaded.name}', uploaded)
-        full_path = default_storage.path(temp_path)
-
-        try:
-            pred, conf, text = predict_and_generate_text(full_path)
-        finally:
-            default_storage.delete(temp_path)
+        if str(request.query_params.get('async', request.data.get('async', ''))).lower() in ('true', 'on', '1', 'yes'):
+            try:
+                job_id = submit_analysis(request.user, read_image_bytes(uploaded))
+            except JobQueueFull as e:
+                return Response({'detail': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return Response(job_links(job_id), status=status.HTTP_202_ACCEPTED)
 
-        data = {'severity': pred, 'confidence': conf, 'generated_text': text}
+        # Analyze straight from the upload buffer; nothing is written to disk
+        data = analyze_image(uploaded)
         return Response(data, status=status.HTTP_200_OK)
 
 
+class AnalyzeJobView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_job(job_id, request.user)
+        if job is None:
+            return Response({'detail': 'job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(public_fields(job), status=status.HTTP_200_OK)
+
+
+def _api_user(request):
+    """The user that AnalyzeJobView's authenticators (session, Basic, ...) resolve, or None"""
+    try:
+        return Request(request, authenticators=AnalyzeJobView().get_authenticators()).user
+    except AuthenticationFailed:
+        return None
+
+
+async def analyze_job_events_view(request, job_id):
+    """Server-sent events for an analyze job; streams incrementally when served through ASGI."""
+    user = await sync_to_async(_api_user)(request)
+    if user is None or not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+    if await aget_job(job_id, user) is None:
+        return JsonResponse({'detail': 'job not found'}, status=404)
+    # WSGI buffers an async iterator until it is exhausted, so it gets a blocking generator instead
+    events = stream_job_events(job_id, user) if isinstance(request, ASGIRequest) else iter_job_events(job_id, user)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 class ComplaintCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
@@ -70,9 +115,10 @@ class ComplaintCreateView(APIView):
         except Exception:
             complaint.confidence = 0.5
         complaint.generated_text = request.data.get('generated_text', '')
-        complaint.save()
-        complaint.mongo_file_id = _save_to_mongo(complaint.image.path)
-        complaint.save()
+        complaint.model_version = str(request.data.get('model_version', ''))[:100]
+        with stage_timer('file_save'):
+            complaint.save()
+        mirror_to_gridfs(complaint)
 
         return Response({
             'id': complaint.pk,
@@ -90,13 +136,28 @@ class UploadComplaintView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         username = serializer.validated_data['username']
-        image = serializer.validated_data['image']
 
         try:
             user = User.objects.get(username=username)
         except User.DoesNotExist:
             return Response({'detail': 'username not found'}, status=status.HTTP_400_BAD_REQUEST)
 
+        session_id = serializer.validated_data.get('upload_session')
+        if not session_id:
+            return self._create(user, serializer.validated_data['image'])
+
+        # Finish a resumable upload (see UploadSessionView)
+        session = UploadSession.objects.filter(pk=session_id, user=user).first()
+        if session is None:
+            return Response({'detail': 'upload_session not found'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with completed_upload(session) as image:
+                return self._create(user, image)
+        except UploadError as e:
+            return Response({'detail': str(e), 'offset': session.offset}, status=status.HTTP_409_CONFLICT,
+                            headers={'Upload-Offset': str(session.offset)})
+
+    def _create(self, user, image):
         # Create a minimal complaint record to hold the image
         complaint = Complaint(user=user, public=False)
         complaint.image = image
@@ -109,16 +170,13 @@ class UploadComplaintView(APIView):
         complaint.description = ''
         complaint.save()
 
-        # Optional store to Mongo if configured
-        try:
-            complaint.mongo_file_id = _save_to_mongo(complaint.image.path)
-            complaint.save()
-        except Exception:
-            pass
+        # Optional GridFS mirror, written in the background
+        mirror_to_gridfs(complaint)
 
         # Call AI model to generate draft and severity
         # Adjusted to pass a file-like object (the uploaded image) and support multiple return shapes
         try:
+            image.seek(0)
             model_result = process_complaint_image(image)
             draft = None
             severity = None
@@ -140,6 +198,73 @@ class UploadComplaintView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
 
 
+class UploadSessionCreateView(APIView):
+    """Start a resumable chunked upload; the image is then sent with PATCH to UploadSessionView"""
+    permission_classes = [permissions.AllowAny]
+    parser_classes = [parsers.JSONParser, parsers.FormParser]
+
+    def post(self, request):
+        serializer = UploadSessionCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            user = User.objects.get(username=data['username'])
+        except User.DoesNotExist:
+            return Response({'detail': 'username not found'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = create_session(user, data['filename'], data['size'], data.get('sha256', ''), data.get('content_type', ''))
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return Response({
+            'upload_session': str(session.pk),
+            'offset': 0,
+            'size': session.size,
+            'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+            'upload_url': reverse('api_upload_session', args=[session.pk]),
+        }, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    """
+    GET reports how many bytes have arrived; PATCH appends the next chunk.
+
+    Chunks are sent as the raw request body with an Upload-Offset header, and
+    are streamed to disk rather than parsed. After a dropped connection the
+    client GETs the offset and carries on from there.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def _state(self, session):
+        return {'upload_session': str(session.pk), 'offset': session.offset, 'size': session.size}
+
+    def get(self, request, session_id):
+        session = UploadSession.objects.filter(pk=session_id).first()
+        if session is None:
+            return Response({'detail': 'upload_session not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self._state(session), headers={'Upload-Offset': str(session.offset)})
+
+    def patch(self, request, session_id):
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response({'detail': 'Upload-Offset and Content-Length headers are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.UPLOAD_CHUNK_SIZE:
+            return Response({'detail': f'Chunks may be at most {settings.UPLOAD_CHUNK_SIZE} bytes'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            session = append_chunk(session_id, offset, request.stream, length)
+        except UploadSession.DoesNotExist:
+            return Response({'detail': 'upload_session not found'}, status=status.HTTP_404_NOT_FOUND)
+        except OffsetMismatch as e:
+            return Response({'detail': str(e), 'offset': e.offset}, status=status.HTTP_409_CONFLICT,
+                            headers={'Upload-Offset': str(e.offset)})
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self._state(session), headers={'Upload-Offset': str(session.offset)})
+
+
 class PostComplaintView(APIView):
     permission_classes = [permissions.AllowAny]
     parser_classes = [parsers.JSONParser, parsers.FormParser]
@@ -192,7 +317,6 @@ class PostComplaintView(APIView):
 
         return Response({'success': True, 'id': complaint.pk}, status=status.HTTP_200_OK)
 
-from django.http import JsonResponse
 
 def test_connection(request):
     return JsonResponse({
@@ -200,3 +324,28 @@ def test_connection(request):
         "message": "✅ Awaaz backend is reachable from your network!"
     })
 
+
+def readiness_view(request):
+    """Readiness probe: 200 once this worker can serve predictions warm, 503 otherwise."""
+    state = readiness()
+    if not state['ready']:
+        # Workers started without INFERENCE_WARMUP begin warming on the first probe
+        start_warm_up()
+    return JsonResponse(state, status=200 if state['ready'] else 503)
+
+
+def _metrics_authorized(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        scheme, _, credential = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() == 'bearer' and secrets.compare_digest(credential.strip().encode(), token.encode()):
+            return True
+    # Behind a reverse proxy every client appears as the proxy's address, so this list is empty by default
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for this process; requires METRICS_TOKEN or an address in METRICS_ALLOWED_IPS."""
+    if not _metrics_authorized(request):
+        return HttpResponse(status=403)
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,6 +2,8 @@
 ASGI config for awaaz_web project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it (e.g. ``uvicorn awaaz_web.asgi:application``) to stream analyze job
+events from /api/analyze/jobs/<id>/events/ as they happen.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -14,3 +16,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'awaaz_web.settings')
 
 application = get_asgi_application()
+
+# Preload or warm the model here rather than in AppConfig.ready(), so only
+# server processes pay for it (see complaints.services.prepare_serving)
+from complaints.services import prepare_serving  # noqa: E402
+
+prepare_serving()
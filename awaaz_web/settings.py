@@ -114,6 +114,24 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Optional GridFS mirroring of complaint images (complaints/mongo.py).
+# 'mongomock://localhost/awaaz' uses mongomock instead of a server.
+MONGO_URI = os.environ.get('MONGO_URI', '')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('AWAAZ_MONGO_MAX_POOL_SIZE', '10'))
+MONGO_TIMEOUT_MS = int(os.environ.get('AWAAZ_MONGO_TIMEOUT_MS', '5000'))
+MONGO_HEALTH_INTERVAL = float(os.environ.get('AWAAZ_MONGO_HEALTH_INTERVAL', '30'))
+MONGO_WRITE_QUEUE_SIZE = int(os.environ.get('AWAAZ_MONGO_WRITE_QUEUE_SIZE', '100'))
+MONGO_WRITE_RETRIES = int(os.environ.get('AWAAZ_MONGO_WRITE_RETRIES', '3'))
+
+# Uploads are hashed while they stream in; large ones are staged inside
+# MEDIA_ROOT so saving them is a rename (complaints/uploads.py)
+FILE_UPLOAD_HANDLERS = ['complaints.uploads.HashingUploadHandler']
+UPLOAD_STAGING_DIR = os.environ.get('AWAAZ_UPLOAD_STAGING_DIR', str(MEDIA_ROOT / '.uploads'))
+# Resumable chunked uploads (/api/upload_complaint/sessions/)
+UPLOAD_CHUNK_SIZE = int(os.environ.get('AWAAZ_UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+UPLOAD_MAX_SIZE = int(os.environ.get('AWAAZ_UPLOAD_MAX_SIZE', str(30 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = int(os.environ.get('AWAAZ_UPLOAD_SESSION_TTL', '86400'))
+
 LOGIN_REDIRECT_URL = 'role_redirect'
 LOGOUT_REDIRECT_URL = 'feed'
 LOGIN_URL = 'login'
@@ -121,4 +139,119 @@ LOGIN_URL = 'login'
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# AI inference
+# Micro-batching: concurrent analyze requests arriving within the wait window
+# share one forward pass. The wait (in ms) caps the latency batching can add.
+INFERENCE_BATCHING = os.environ.get('AWAAZ_INFERENCE_BATCHING', '0') == '1'
+INFERENCE_BATCH_SIZE = int(os.environ.get('AWAAZ_INFERENCE_BATCH_SIZE', '8'))
+INFERENCE_BATCH_WAIT_MS = float(os.environ.get('AWAAZ_INFERENCE_BATCH_WAIT_MS', '10'))
+
+# Shared inference server (python manage.py run_inference_server). When set,
+# web workers send images to it instead of loading the model themselves.
+# Accepts unix:/path/to.sock or host:port.
+INFERENCE_SERVER_ADDRESS = os.environ.get('AWAAZ_INFERENCE_SERVER', '')
+INFERENCE_SERVER_TIMEOUT = float(os.environ.get('AWAAZ_INFERENCE_SERVER_TIMEOUT', '5'))
+
+# Prediction cache keyed by image content hash + model version. Repeated
+# analyses of the same photo skip the model. PREDICTION_CACHE_SIZE bounds the
+# in-memory LRU (0 disables it); PREDICTION_CACHE_PATH adds a SQLite tier.
+PREDICTION_CACHE_SIZE = int(os.environ.get('AWAAZ_PREDICTION_CACHE_SIZE', '1024'))
+PREDICTION_CACHE_PATH = os.environ.get('AWAAZ_PREDICTION_CACHE_PATH', '')
+
+# Inference backend: 'eager' loads checkpoints/best.pt with PyTorch;
+# 'torchscript' or 'onnx' load the artifact at INFERENCE_MODEL_PATH produced by
+# `python -m src.models.export` (onnx needs onnxruntime installed).
+INFERENCE_BACKEND = os.environ.get('AWAAZ_INFERENCE_BACKEND', 'eager')
+INFERENCE_MODEL_PATH = os.environ.get('AWAAZ_INFERENCE_MODEL_PATH', '')
+
+# Versioned model registry (python -m src.models.registry). Unless
+# INFERENCE_MODEL_PATH pins an artifact, the registry's active version is served
+# and workers check its ACTIVE pointer every MODEL_RELOAD_INTERVAL seconds
+# (0 disables hot reload), swapping in a newly activated version without a restart.
+MODEL_REGISTRY_DIR = os.environ.get('AWAAZ_MODEL_REGISTRY', 'model_registry')
+MODEL_RELOAD_INTERVAL = float(os.environ.get('AWAAZ_MODEL_RELOAD_INTERVAL', '10'))
+
+# Warm the model up when a server process starts (awaaz_web/wsgi.py, asgi.py and
+# gunicorn's post_fork) instead of inside the first request; management commands
+# never warm up. /api/health/ready returns 503 until warm-up has finished.
+INFERENCE_WARMUP = os.environ.get('AWAAZ_INFERENCE_WARMUP', '0') == '1'
+INFERENCE_WARMUP_ITERATIONS = int(os.environ.get('AWAAZ_INFERENCE_WARMUP_ITERATIONS', '3'))
+
+# Load the model when gunicorn loads the app, before it forks its workers, so
+# they share one copy of the weights (set by gunicorn.conf.py). Check the
+# sharing with `python manage.py memory_report --gunicorn <master pid>`.
+INFERENCE_PRELOAD = os.environ.get('AWAAZ_INFERENCE_PRELOAD', '0') == '1'
+
+# CPU topology per web process. INFERENCE_INTRA_OP_THREADS / INFERENCE_INTER_OP_THREADS
+# set torch's thread pools (0 keeps torch's default of one thread per core, which
+# oversubscribes the box when several workers run); INFERENCE_MAX_CONCURRENCY
+# caps concurrent inferences per process (0: unlimited). Find values for a
+# machine with `python manage.py autotune_inference`.
+INFERENCE_INTRA_OP_THREADS = int(os.environ.get('AWAAZ_INFERENCE_INTRA_OP_THREADS', '0'))
+INFERENCE_INTER_OP_THREADS = int(os.environ.get('AWAAZ_INFERENCE_INTER_OP_THREADS', '0'))
+INFERENCE_MAX_CONCURRENCY = int(os.environ.get('AWAAZ_INFERENCE_MAX_CONCURRENCY', '0'))
+
+# Ingest normalization of uploaded complaint images (complaints/ingest.py)
+INGEST_NORMALIZE = os.environ.get('AWAAZ_INGEST_NORMALIZE', '1') == '1'
+INGEST_MAX_EDGE = int(os.environ.get('AWAAZ_INGEST_MAX_EDGE', '2048'))
+INGEST_FORMAT = os.environ.get('AWAAZ_INGEST_FORMAT', 'JPEG')  # JPEG or WEBP
+INGEST_QUALITY = int(os.environ.get('AWAAZ_INGEST_QUALITY', '85'))
+INGEST_KEEP_ORIGINALS = os.environ.get('AWAAZ_INGEST_KEEP_ORIGINALS', '0') == '1'
+INGEST_ORIGINALS_DIR = os.environ.get('AWAAZ_INGEST_ORIGINALS_DIR', str(BASE_DIR / 'originals'))
+
+# How long an analyzed upload waits server-side for the user to post it (complaints/tokens.py)
+ANALYSIS_TOKEN_TTL = int(os.environ.get('AWAAZ_ANALYSIS_TOKEN_TTL', '1800'))
+
+# Complaint image derivatives (complaints/derivatives.py): WebP and JPEG copies
+# at these widths, generated in the background after each upload
+DERIVATIVE_WIDTHS = [int(w) for w in os.environ.get('AWAAZ_DERIVATIVE_WIDTHS', '160,320,640,1280').split(',')]
+DERIVATIVE_QUALITY = int(os.environ.get('AWAAZ_DERIVATIVE_QUALITY', '80'))
+DERIVATIVES_ASYNC = os.environ.get('AWAAZ_DERIVATIVES_ASYNC', '1') == '1'
+
+# Asynchronous analyze jobs (POST /api/analyze/?async=1). Inference runs on a
+# pool of INFERENCE_ASYNC_WORKERS threads per process; submissions beyond
+# INFERENCE_ASYNC_MAX_PENDING are rejected with 503. Job state is kept in the
+# default cache, which must be shared (e.g. Redis) when running several
+# processes. Server-sent events stream best under ASGI (awaaz_web.asgi).
+INFERENCE_ASYNC_WORKERS = int(os.environ.get('AWAAZ_INFERENCE_ASYNC_WORKERS', '2'))
+INFERENCE_ASYNC_MAX_PENDING = int(os.environ.get('AWAAZ_INFERENCE_ASYNC_MAX_PENDING', '32'))
+INFERENCE_ASYNC_JOB_TTL = int(os.environ.get('AWAAZ_INFERENCE_ASYNC_JOB_TTL', '600'))
+INFERENCE_ASYNC_WEB = os.environ.get('AWAAZ_INFERENCE_ASYNC_WEB', '0') == '1'
+
+# Confidence below which a 'good' prediction from the full model is reported
+# as 'minor'
+INFERENCE_GOOD_THRESHOLD = float(os.environ.get('AWAAZ_INFERENCE_GOOD_THRESHOLD', '0.6'))
+
+# Two-stage cascade: a small screening model (train.py --arch screen) answers
+# when it predicts one of INFERENCE_SCREEN_EXIT_CLASSES with at least
+# INFERENCE_SCREEN_THRESHOLD confidence; everything else goes to the full model.
+INFERENCE_CASCADE = os.environ.get('AWAAZ_INFERENCE_CASCADE', '0') == '1'
+INFERENCE_SCREEN_MODEL_PATH = os.environ.get('AWAAZ_INFERENCE_SCREEN_MODEL_PATH', 'checkpoints/screen/best.pt')
+INFERENCE_SCREEN_THRESHOLD = float(os.environ.get('AWAAZ_INFERENCE_SCREEN_THRESHOLD', '0.9'))
+INFERENCE_SCREEN_EXIT_CLASSES = os.environ.get('AWAAZ_INFERENCE_SCREEN_EXIT_CLASSES', 'good,severe').split(',')
+
+# Prometheus metrics at /api/metrics, served to requests carrying
+# "Authorization: Bearer <METRICS_TOKEN>" or coming from METRICS_ALLOWED_IPS.
+# Both are empty by default, which keeps the endpoint closed.
+METRICS_TOKEN = os.environ.get('AWAAZ_METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('AWAAZ_METRICS_ALLOWED_IPS', '').split(',') if ip]
+
+# Structured logging: one JSON object per line on stderr. Inference logs carry
+# severity, model version and per-stage timings (stages_ms) as fields.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'complaints.logs.JsonFormatter'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'json'},
+    },
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+    'loggers': {
+        'complaints': {'handlers': ['console'], 'level': os.environ.get('AWAAZ_LOG_LEVEL', 'INFO'), 'propagate': False},
+        'django': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
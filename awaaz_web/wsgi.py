@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'awaaz_web.settings')
 
 application = get_wsgi_application()
+
+# Preload or warm the model here rather than in AppConfig.ready(), so only
+# server processes pay for it (see complaints.services.prepare_serving)
+from complaints.services import prepare_serving  # noqa: E402
+
+prepare_serving()
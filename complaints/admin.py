@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Complaint, Comment, AadhaarOTP, Report, UserProfile, UserNotification, Announcement
+from .models import Complaint, Comment, AadhaarOTP, Report, UserProfile, UserNotification, Announcement, StoredFile
 
 # Register your models here.
 class CommentInline(admin.TabularInline):
@@ -10,8 +10,8 @@ class CommentInline(admin.TabularInline):
     show_change_link = True
 
 class ComplaintAdmin(admin.ModelAdmin):
-    list_display = ('title', 'user', 'created_at', 'predicted_severity', 'confidence')
-    list_filter = ('predicted_severity', 'created_at')
+    list_display = ('title', 'user', 'created_at', 'predicted_severity', 'confidence', 'model_version', 'mongo_status')
+    list_filter = ('predicted_severity', 'model_version', 'mongo_status', 'created_at')
     search_fields = ('title', 'description', 'user__username')
     readonly_fields = ('created_at',)
     inlines = [CommentInline]
@@ -70,12 +70,18 @@ class UserNotificationAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'title', 'message')
     readonly_fields = ('created_at',)
 
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'created_at')
+    search_fields = ('name', 'sha256')
+    readonly_fields = ('name', 'sha256', 'size', 'refcount', 'created_at')
+
 admin.site.register(Complaint, ComplaintAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(AadhaarOTP, AadhaarOTPAdmin)
 admin.site.register(Report, ReportAdmin)
 admin.site.register(UserProfile, UserProfileAdmin)
 admin.site.register(UserNotification, UserNotificationAdmin)
+admin.site.register(StoredFile, StoredFileAdmin)
 @admin.register(Announcement)
 class AnnouncementAdmin(admin.ModelAdmin):
     list_display = ('title', 'audience', 'is_published', 'published_at', 'created_by')
@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+
+class InferenceBatcher:
+    """
+    Coalesce concurrent single-image requests into one batched forward pass.
+
+    Callers block in ``submit`` while a background thread gathers whatever
+    arrives within ``max_wait_ms`` of the first queued item (or until
+    ``max_batch_size`` items are waiting) and hands the whole batch to
+    ``run_batch``. ``max_wait_ms`` is therefore the ceiling on latency added
+    by batching; a lone request is never held longer than that.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name='inference-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Queue one item and block until its result is available."""
+        if self._closed:
+            raise RuntimeError('InferenceBatcher is closed')
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result(timeout=timeout)
+
+    def close(self) -> None:
+        """Stop the worker thread once the queue has drained."""
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                # Re-queue the sentinel so the worker exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            futures = [future for _, future in batch]
+            try:
+                results = self.run_batch([item for item, _ in batch])
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
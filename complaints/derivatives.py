@@ -0,0 +1,161 @@
+"""
+Resized WebP/JPEG derivatives of complaint images.
+
+Pages that show a complaint as a card or a 64px thumbnail should not download
+the original phone photo. On save, each Complaint gets a set of smaller
+renditions at DERIVATIVE_WIDTHS, recorded in ``Complaint.image_variants``:
+
+    {
+        "source": "complaints/photo.jpg",
+        "width": 4032, "height": 3024,
+        "webp": {"160": "complaints/derived/photo-160.webp", ...},
+        "jpeg": {"160": "complaints/derived/photo-160.jpg", ...},
+    }
+
+Generation runs on a small background pool after the transaction commits.
+Until it finishes, templates show a placeholder (see templatetags/complaint_images.py).
+`python manage.py generate_image_variants` backfills existing media.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'webp': ('WEBP', 'webp'), 'jpeg': ('JPEG', 'jpg')}
+
+_executor = None
+_executor_lock = threading.Lock()
+# Complaint ids queued or being processed; views save a complaint more than once
+_pending = set()
+
+
+def _widths():
+    return sorted(getattr(settings, 'DERIVATIVE_WIDTHS', (160, 320, 640, 1280)))
+
+
+def _derived_name(source_name, width, extension):
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return f'{directory}/derived/{stem}-{width}.{extension}'
+
+
+def is_current(complaint):
+    """True if the recorded variants were generated from the complaint's current image"""
+    variants = complaint.image_variants or {}
+    return bool(complaint.image) and variants.get('source') == complaint.image.name
+
+
+def generate_variants(complaint):
+    """
+    Render every derivative of the complaint's image and store it next to the original.
+
+    Widths larger than the original are skipped (the smallest is always produced).
+
+    Returns:
+        dict: the value for ``Complaint.image_variants``
+    """
+    from PIL import Image, ImageOps
+
+    quality = getattr(settings, 'DERIVATIVE_QUALITY', 80)
+    with complaint.image.open('rb') as f:
+        image = Image.open(f)
+        # JPEG draft decoding: let libjpeg downscale while decoding for large photos
+        largest = _widths()[-1]
+        if image.format == 'JPEG':
+            image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    original_width, original_height = image.size
+
+    variants = {'source': complaint.image.name, 'width': original_width, 'height': original_height}
+    widths = [w for w in _widths() if w < original_width] or _widths()[:1]
+    for width in widths:
+        height = max(1, round(original_height * width / original_width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        for key, (pil_format, extension) in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, format=pil_format, quality=quality, optimize=pil_format == 'JPEG', progressive=pil_format == 'JPEG')
+            name = _derived_name(complaint.image.name, width, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants.setdefault(key, {})[str(width)] = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def delete_variants(variants):
+    """Remove the stored files of an ``image_variants`` dict"""
+    for key in FORMATS:
+        for name in (variants or {}).get(key, {}).values():
+            try:
+                default_storage.delete(name)
+            except OSError:
+                pass
+
+
+def release_variants(variants):
+    """Delete derivatives unless another complaint still shows the same (deduplicated) image"""
+    from .models import Complaint
+
+    source = (variants or {}).get('source')
+    if source and not Complaint.objects.filter(image=source).exists():
+        delete_variants(variants)
+
+
+def update_variants(complaint_id, force=False):
+    """
+    Generate derivatives for one complaint and record them without re-sending post_save.
+
+    Complaints sharing a stored image (see complaints/storage.py) reuse each other's derivatives.
+
+    Returns:
+        bool: True if derivatives were generated
+    """
+    from .models import Complaint
+
+    complaint = Complaint.objects.filter(pk=complaint_id).first()
+    if complaint is None or not complaint.image or (is_current(complaint) and not force):
+        return False
+    previous = complaint.image_variants
+    variants = None
+    if not force:
+        for sibling in Complaint.objects.filter(image=complaint.image.name).exclude(pk=complaint_id)[:5]:
+            if is_current(sibling):
+                variants = sibling.image_variants
+                break
+    if variants is None:
+        variants = generate_variants(complaint)
+    Complaint.objects.filter(pk=complaint_id, image=complaint.image.name).update(image_variants=variants)
+    if previous and previous.get('source') != complaint.image.name:
+        release_variants(previous)
+    return True
+
+
+def _run(complaint_id):
+    try:
+        update_variants(complaint_id)
+    except Exception:
+        logger.exception('Could not generate image variants', extra={'complaint_id': complaint_id})
+    finally:
+        with _executor_lock:
+            _pending.discard(complaint_id)
+
+
+def schedule_variants(complaint_id):
+    """Generate derivatives in the background (or inline when DERIVATIVES_ASYNC is off)"""
+    global _executor
+    with _executor_lock:
+        if complaint_id in _pending:
+            return
+        _pending.add(complaint_id)
+        if _executor is None and getattr(settings, 'DERIVATIVES_ASYNC', True):
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-variants')
+    if not getattr(settings, 'DERIVATIVES_ASYNC', True):
+        _run(complaint_id)
+        return
+    _executor.submit(_run, complaint_id)
@@ -0,0 +1,158 @@
+"""
+Shared inference daemon.
+
+One process loads the severity model and serves predictions to every Django
+worker over a Unix domain socket or a local TCP socket, so web workers do not
+each hold a copy of the weights.
+
+Wire format (both directions): a 4-byte big-endian header length, a JSON
+header, then ``header['size']`` bytes of payload (the encoded image for
+requests, nothing for responses).
+"""
+import json
+import os
+import socket
+import socketserver
+import struct
+from typing import Optional, Tuple
+
+_HEADER = struct.Struct('>I')
+MAX_HEADER_SIZE = 64 * 1024
+MAX_PAYLOAD_SIZE = 64 * 1024 * 1024
+
+
+class InferenceServerError(Exception):
+    """Raised by the client when the server is unreachable or returns an error."""
+
+
+def parse_address(address: str):
+    """
+    Turn a configured address into (family, sockaddr).
+
+    ``unix:/run/awaaz.sock`` or ``/run/awaaz.sock`` selects a Unix socket,
+    ``127.0.0.1:8765`` (or ``tcp:127.0.0.1:8765``) a TCP socket.
+    """
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    if address.startswith('/'):
+        return socket.AF_UNIX, address
+    if address.startswith('tcp:'):
+        address = address[len('tcp:'):]
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f'Invalid inference server address: {address!r}')
+    return socket.AF_INET, (host, int(port))
+
+
+def _recv_exactly(sock, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError('Connection closed mid-message')
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_message(sock, header: dict, payload: bytes = b'') -> None:
+    header = dict(header, size=len(payload))
+    encoded = json.dumps(header).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(encoded)) + encoded)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock) -> Tuple[dict, bytes]:
+    (header_size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    if header_size > MAX_HEADER_SIZE:
+        raise ValueError('Header too large')
+    header = json.loads(_recv_exactly(sock, header_size).decode('utf-8'))
+    size = int(header.get('size', 0))
+    if size > MAX_PAYLOAD_SIZE:
+        raise ValueError('Payload too large')
+    payload = _recv_exactly(sock, size) if size else b''
+    return header, payload
+
+
+def request(address: str, header: dict, payload: bytes = b'', timeout: Optional[float] = None) -> dict:
+    """Send one request and return the decoded response header."""
+    family, sockaddr = parse_address(address)
+    try:
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(sockaddr)
+            send_message(sock, header, payload)
+            response, _ = recv_message(sock)
+    except (OSError, ValueError) as e:
+        raise InferenceServerError(f'Inference server request failed: {e}') from e
+    if not response.get('ok'):
+        raise InferenceServerError(response.get('error', 'Inference server returned an error'))
+    return response
+
+
+def predict_remote(address: str, image_bytes: bytes, timeout: Optional[float] = None) -> Tuple[str, float, str]:
+    """Ask the inference server to classify an encoded image. Returns (label, confidence, model_version)."""
+    response = request(address, {'op': 'predict'}, image_bytes, timeout=timeout)
+    return response['label'], float(response['confidence']), response.get('model_version', '')
+
+
+def ping(address: str, timeout: Optional[float] = None) -> dict:
+    return request(address, {'op': 'ping'}, timeout=timeout)
+
+
+class _InferenceRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        from . import services
+
+        try:
+            header, payload = recv_message(self.request)
+            op = header.get('op')
+            if op == 'ping':
+                model, version = services.current_model()
+                response = {'ok': True, 'model_loaded': model is not None, 'model_version': version}
+            elif op == 'predict':
+                model, version = services.current_model()
+                if model is None:
+                    response = {'ok': False, 'error': 'Model is not loaded'}
+                else:
+                    label, confidence = services.predict_label(model, payload, version)
+                    response = {
+                        'ok': True,
+                        'label': label,
+                        'confidence': confidence,
+                        'model_version': services.model_version(version),
+                    }
+            else:
+                response = {'ok': False, 'error': f'Unknown op: {op!r}'}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+        try:
+            send_message(self.request, response)
+        except OSError:
+            pass
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(address: str):
+    """
+    Build a threaded server bound to ``address``.
+
+    Each connection is served on its own thread, so with INFERENCE_BATCHING
+    enabled concurrent requests from different workers share forward passes.
+    """
+    family, sockaddr = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(sockaddr):
+            os.unlink(sockaddr)
+        return _ThreadingUnixServer(sockaddr, _InferenceRequestHandler)
+    return _ThreadingTCPServer(sockaddr, _InferenceRequestHandler)
@@ -0,0 +1,113 @@
+"""
+Ingest-time normalization of complaint images.
+
+Phones upload 5-15 MB originals with EXIF (including GPS) that nothing
+downstream needs. Before a new Complaint.image is stored, normalize_image():
+
+- applies the EXIF orientation to the pixels,
+- caps the long edge at INGEST_MAX_EDGE,
+- drops EXIF (including GPS) and other metadata, keeping only the colour profile,
+- re-encodes as INGEST_FORMAT ('JPEG' or 'WEBP') at INGEST_QUALITY.
+
+It runs from a pre_save signal (complaints/signals.py), so web, API and admin
+uploads are all treated the same. With INGEST_KEEP_ORIGINALS the untouched
+upload is kept in Complaint.original_image, in separate storage outside MEDIA_ROOT.
+"""
+import hashlib
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+
+def _size(upload):
+    size = getattr(upload, 'size', None)
+    if size is None:
+        upload.seek(0, os.SEEK_END)
+        size = upload.tell()
+    return size
+
+
+def normalize_image(upload):
+    """
+    Return a normalized copy of an uploaded image, or `upload` itself if that is already optimal.
+
+    The upload is kept when re-encoding would not shrink it and there was
+    nothing to fix (no rotation, resize or metadata). Images Pillow cannot
+    decode are also kept as they are.
+
+    Returns:
+        File: a ContentFile carrying ``sha256``, or the original upload
+    """
+    from PIL import Image, ImageOps
+
+    max_edge = getattr(settings, 'INGEST_MAX_EDGE', 2048)
+    pil_format = getattr(settings, 'INGEST_FORMAT', 'JPEG').upper()
+    quality = getattr(settings, 'INGEST_QUALITY', 85)
+    original_size = _size(upload)
+
+    with metrics.stage_timer('normalize'):
+        try:
+            upload.seek(0)
+            image = Image.open(upload)
+            source_format = image.format
+            exif = image.getexif()
+            has_metadata = bool(exif or image.info.get('xmp') or image.info.get('comment'))
+            rotated = exif.get(0x0112, 1) != 1
+            # The colour profile is kept: dropping it shifts the colours of wide-gamut phone photos
+            icc_profile = image.info.get('icc_profile')
+            if source_format == 'JPEG':
+                # Let libjpeg decode at a reduced scale when the photo is far larger than needed
+                image.draft('RGB', (max_edge, max_edge))
+            image = ImageOps.exif_transpose(image)
+            resized = max(image.size) > max_edge
+            if resized:
+                image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            if image.mode not in (('RGB', 'L') if pil_format == 'JPEG' else ('RGB', 'RGBA')):
+                image = image.convert('RGB')
+
+            buffer = io.BytesIO()
+            options = {'quality': quality}
+            if icc_profile:
+                options['icc_profile'] = icc_profile
+            if pil_format == 'JPEG':
+                options.update(optimize=True, progressive=True)
+            else:
+                options.update(method=4)
+            image.save(buffer, format=pil_format, **options)
+        except Exception as e:
+            metrics.INGEST_IMAGES.inc(result='failed')
+            logger.warning('Could not normalize upload; storing it as is', extra={'error': str(e)})
+            upload.seek(0)
+            return upload
+        finally:
+            upload.seek(0)
+
+    data = buffer.getvalue()
+    metrics.INGEST_BYTES.inc(original_size, stage='before')
+    if len(data) >= original_size and not (rotated or resized or has_metadata) and source_format == pil_format:
+        metrics.INGEST_IMAGES.inc(result='kept')
+        metrics.INGEST_BYTES.inc(original_size, stage='after')
+        return upload
+
+    metrics.INGEST_IMAGES.inc(result='normalized')
+    metrics.INGEST_BYTES.inc(len(data), stage='after')
+    logger.info('Normalized upload', extra={
+        'bytes_before': original_size,
+        'bytes_after': len(data),
+        'size': list(image.size),
+        'rotated': rotated,
+        'resized': resized,
+    })
+    stem = os.path.splitext(os.path.basename(getattr(upload, 'name', '') or 'image'))[0]
+    normalized = ContentFile(data, name=stem + _EXTENSIONS[pil_format])
+    normalized.sha256 = hashlib.sha256(data).hexdigest()
+    return normalized
@@ -0,0 +1,196 @@
+"""
+Asynchronous analyze jobs.
+
+The request that submits a job returns immediately with a job id. Inference
+runs on a bounded thread pool, and job state lives in the Django cache. Clients
+poll that state or stream it over server-sent events. With more than one web
+process, CACHES must point at a shared backend (Redis, Memcached, database) so
+any worker can answer for a job.
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .services import analyze_image
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+class JobQueueFull(Exception):
+    """Raised when INFERENCE_ASYNC_MAX_PENDING jobs are already queued or running."""
+
+
+def _cache_key(job_id):
+    return f'analyze-job:{job_id}'
+
+
+def _get_executor():
+    global _executor, _slots
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _slots = threading.BoundedSemaphore(getattr(settings, 'INFERENCE_ASYNC_MAX_PENDING', 32))
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'INFERENCE_ASYNC_WORKERS', 2),
+                    thread_name_prefix='analyze-job',
+                )
+    return _executor
+
+
+def _ttl():
+    return getattr(settings, 'INFERENCE_ASYNC_JOB_TTL', 600)
+
+
+def _store(job_id, job):
+    cache.set(_cache_key(job_id), job, _ttl())
+
+
+def _run(job_id, job, image_bytes, keep_name=None):
+    try:
+        _store(job_id, dict(job, status='running'))
+        if keep_name is not None:
+            from django.core.files.base import ContentFile
+
+            from .tokens import analyze_and_keep
+
+            result = analyze_and_keep(job['user_id'], ContentFile(image_bytes, name=keep_name))
+        else:
+            result = analyze_image(image_bytes)
+        _store(job_id, dict(job, status='done', **result))
+    except Exception as e:
+        _store(job_id, dict(job, status='failed', error=str(e)))
+    finally:
+        _slots.release()
+
+
+def submit_analysis(user, image_bytes, keep_name=None):
+    """
+    Queue an analysis of encoded image bytes for ``user``.
+
+    With ``keep_name`` (the upload's file name) the image and result are kept
+    under an analysis token (complaints/tokens.py) returned with the result.
+
+    Returns:
+        str: the job id
+
+    Raises:
+        JobQueueFull: if too many jobs are already pending in this process
+    """
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        raise JobQueueFull('Too many analyses in progress, please retry shortly.')
+    job_id = uuid.uuid4().hex
+    job = {'id': job_id, 'user_id': user.pk, 'status': 'pending'}
+    _store(job_id, job)
+    try:
+        executor.submit(_run, job_id, job, image_bytes, keep_name)
+    except Exception:
+        _slots.release()
+        raise
+    return job_id
+
+
+def get_job(job_id, user=None):
+    """Return the job dict, or None if it is unknown, expired, or belongs to another user."""
+    job = cache.get(_cache_key(job_id))
+    if job is None or (user is not None and job.get('user_id') != user.pk):
+        return None
+    return job
+
+
+async def aget_job(job_id, user=None):
+    job = await cache.aget(_cache_key(job_id))
+    if job is None or (user is not None and job.get('user_id') != user.pk):
+        return None
+    return job
+
+
+def public_fields(job):
+    """Job fields safe to return to the client."""
+    return {k: v for k, v in job.items() if k != 'user_id'}
+
+
+def job_links(job_id):
+    """Response body for a freshly submitted job."""
+    from django.urls import reverse
+
+    return {
+        'job_id': job_id,
+        'status': 'pending',
+        'status_url': reverse('api_analyze_job', args=[job_id]),
+        'events_url': reverse('api_analyze_job_events', args=[job_id]),
+    }
+
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def _job_event(job_id, job, last_status):
+    """
+    The SSE message for a job's latest state.
+
+    Returns:
+        tuple: (message or None when unchanged, status, whether the stream is finished)
+    """
+    if job is None:
+        return _sse('failed', {'job_id': job_id, 'status': 'failed', 'error': 'Job not found or expired'}), None, True
+    if job['status'] == last_status:
+        return None, last_status, False
+    event = job['status'] if job['status'] in ('done', 'failed') else 'status'
+    return _sse(event, public_fields(job)), job['status'], event != 'status'
+
+
+async def stream_job_events(job_id, user):
+    """
+    Server-sent events for one job: a ``status`` event on every state change,
+    ending with ``done`` or ``failed``. Comment lines keep idle proxies from
+    closing the connection while the job waits for a worker.
+    """
+    interval = getattr(settings, 'INFERENCE_ASYNC_POLL_INTERVAL', 0.25)
+    heartbeat_every = max(1, int(15 / interval))
+    deadline = time.monotonic() + _ttl()
+    last_status = None
+    ticks = 0
+    while time.monotonic() < deadline:
+        message, last_status, finished = _job_event(job_id, await aget_job(job_id, user), last_status)
+        if message:
+            yield message
+        if finished:
+            return
+        ticks += 1
+        if ticks % heartbeat_every == 0:
+            yield ': keep-alive\n\n'
+        await asyncio.sleep(interval)
+
+
+def iter_job_events(job_id, user):
+    """
+    stream_job_events() for WSGI servers, which buffer async iterators until they finish.
+
+    This holds a worker thread for the length of the job, so pages served over
+    WSGI poll the job's status URL instead (see templates/complaints/upload.html).
+    """
+    interval = getattr(settings, 'INFERENCE_ASYNC_POLL_INTERVAL', 0.25)
+    heartbeat_every = max(1, int(15 / interval))
+    deadline = time.monotonic() + _ttl()
+    last_status = None
+    ticks = 0
+    while time.monotonic() < deadline:
+        message, last_status, finished = _job_event(job_id, get_job(job_id, user), last_status)
+        if message:
+            yield message
+        if finished:
+            return
+        ticks += 1
+        if ticks % heartbeat_every == 0:
+            yield ': keep-alive\n\n'
+        time.sleep(interval)
@@ -0,0 +1,29 @@
+"""
+Structured JSON logging, configured through settings.LOGGING.
+
+Each record becomes one JSON object per line. Fields passed with
+``logger.info(..., extra={...})`` are merged in, so inference logs carry the
+severity, model version and per-stage timings as fields rather than text.
+"""
+import json
+import logging
+import time
+
+# Attributes every LogRecord has; anything else came from ``extra``
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
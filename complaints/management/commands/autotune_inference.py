@@ -0,0 +1,182 @@
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from src.utils.benchmark import synthetic_jpeg
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def _ints(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+class Command(BaseCommand):
+    help = (
+        'Sweep torch intra/inter-op threads, per-process inference concurrency and the number '
+        'of worker processes on this machine through the real predict_and_generate_text path, '
+        'and recommend the combination with the best throughput whose p99 stays under --max-p99-ms.'
+    )
+
+    def add_arguments(self, parser):
+        cpus = os.cpu_count() or 1
+        parser.add_argument('--workers', default=','.join(map(str, sorted({1, max(1, cpus // 2), cpus}))),
+                            help='Comma-separated worker process counts to try')
+        parser.add_argument('--intra-op', default=','.join(map(str, sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))))),
+                            help='Comma-separated intra-op thread counts to try')
+        parser.add_argument('--inter-op', default='1', help='Comma-separated inter-op thread counts to try')
+        parser.add_argument('--concurrency', default='1,2', help='Comma-separated per-process max concurrency values to try')
+        parser.add_argument('--clients', type=int, default=4, help='Concurrent requests kept in flight per worker')
+        parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds per trial')
+        parser.add_argument('--resolution', default='1920x1080', help='Synthetic JPEG size')
+        parser.add_argument('--max-p99-ms', type=float, default=1000.0, help='Latency budget for the recommendation')
+        parser.add_argument('--oversubscribe', action='store_true',
+                            help='Also try combinations using more threads than cores (workers x intra-op > CPUs)')
+        parser.add_argument('--out', default='', help='Write all trial results to this JSON file')
+        # Internal: run as one worker process of a trial
+        parser.add_argument('--trial', action='store_true', help='(internal) run one trial worker')
+
+    def handle(self, *args, **options):
+        if options['trial']:
+            return self._trial_worker(options)
+
+        cpus = os.cpu_count() or 1
+        grid = []
+        for workers, intra, inter, concurrency in itertools.product(
+            _ints(options['workers']), _ints(options['intra_op']), _ints(options['inter_op']), _ints(options['concurrency'])
+        ):
+            if workers * intra > cpus and not options['oversubscribe']:
+                continue
+            grid.append({'workers': workers, 'intra_op_threads': intra, 'inter_op_threads': inter, 'max_concurrency': concurrency})
+        if not grid:
+            raise CommandError('No combinations to try; check the option values or pass --oversubscribe.')
+
+        self.stdout.write(f'{len(grid)} trials of {options["duration"]:.0f}s on {cpus} CPUs')
+        self.stdout.write(f"{'workers':>7} {'intra':>5} {'inter':>5} {'conc':>4} {'img/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        results = []
+        for config in grid:
+            result = dict(config, **self._run_trial(config, options))
+            results.append(result)
+            self.stdout.write(
+                f"{config['workers']:>7} {config['intra_op_threads']:>5} {config['inter_op_threads']:>5} "
+                f"{config['max_concurrency']:>4} {result['throughput']:>8.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+            )
+
+        if options['out']:
+            with open(options['out'], 'w') as f:
+                json.dump({'cpus': cpus, 'options': {k: options[k] for k in ('clients', 'duration', 'resolution', 'max_p99_ms')},
+                           'results': results}, f, indent=2)
+
+        within_budget = [r for r in results if r['p99_ms'] <= options['max_p99_ms'] and r['requests']]
+        if not within_budget:
+            raise CommandError(f'No combination kept p99 under {options["max_p99_ms"]:.0f} ms; raise --max-p99-ms.')
+        best = max(within_budget, key=lambda r: r['throughput'])
+        self.stdout.write(self.style.SUCCESS(
+            f"\nBest: {best['throughput']:.1f} img/s at p99 {best['p99_ms']:.0f} ms\n"
+            f"  GUNICORN_WORKERS={best['workers']}\n"
+            f"  AWAAZ_INFERENCE_INTRA_OP_THREADS={best['intra_op_threads']}\n"
+            f"  AWAAZ_INFERENCE_INTER_OP_THREADS={best['inter_op_threads']}\n"
+            f"  AWAAZ_INFERENCE_MAX_CONCURRENCY={best['max_concurrency']}"
+        ))
+
+    def _run_trial(self, config, options):
+        """
+        Start the worker processes with the trial's settings, let them all warm up,
+        then release them together and merge their latencies.
+        """
+        env = dict(
+            os.environ,
+            AWAAZ_INFERENCE_INTRA_OP_THREADS=str(config['intra_op_threads']),
+            AWAAZ_INFERENCE_INTER_OP_THREADS=str(config['inter_op_threads']),
+            AWAAZ_INFERENCE_MAX_CONCURRENCY=str(config['max_concurrency']),
+            # Each request must reach the model, and workers must not log every prediction
+            AWAAZ_PREDICTION_CACHE_SIZE='0',
+            AWAAZ_PREDICTION_CACHE_PATH='',
+            AWAAZ_INFERENCE_WARMUP='0',
+            AWAAZ_INFERENCE_PRELOAD='0',
+            AWAAZ_LOG_LEVEL='WARNING',
+            PYTHONPATH=os.pathsep.join(filter(None, [str(settings.BASE_DIR), os.environ.get('PYTHONPATH', '')])),
+        )
+        command = [
+            sys.executable, '-m', 'django', 'autotune_inference', '--trial',
+            '--settings', os.environ.get('DJANGO_SETTINGS_MODULE', 'awaaz_web.settings'),
+            '--clients', str(options['clients']),
+            '--duration', str(options['duration']),
+            '--resolution', options['resolution'],
+        ]
+        procs = [
+            subprocess.Popen(command, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+            for _ in range(config['workers'])
+        ]
+        try:
+            for proc in procs:
+                if proc.stdout.readline().strip() != 'ready':
+                    raise CommandError('A trial worker failed to load the model.')
+            for proc in procs:
+                proc.stdin.write('go\n')
+                proc.stdin.flush()
+            reports = [json.loads(proc.stdout.readline()) for proc in procs]
+        finally:
+            for proc in procs:
+                proc.stdin.close()
+                proc.wait()
+
+        latencies = sorted(ms for report in reports for ms in report['latencies_ms'])
+        if not latencies:
+            return {'requests': 0, 'errors': sum(r['errors'] for r in reports), 'throughput': 0.0, 'p50_ms': 0.0, 'p99_ms': float('inf')}
+        return {
+            'requests': len(latencies),
+            'errors': sum(r['errors'] for r in reports),
+            'throughput': sum(len(r['latencies_ms']) / r['seconds'] for r in reports),
+            'p50_ms': _percentile(latencies, 0.50),
+            'p99_ms': _percentile(latencies, 0.99),
+        }
+
+    def _trial_worker(self, options):
+        """One worker process of a trial: warm up, wait for 'go', then keep --clients requests in flight."""
+        from complaints import services
+
+        width, _, height = options['resolution'].partition('x')
+        images = [synthetic_jpeg(int(width), int(height), seed=i) for i in range(8)]
+        if not services.warm_up():
+            self.stdout.write('failed')
+            return
+        self.stdout.write('ready')
+        self.stdout.flush()
+        sys.stdin.readline()
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def client(index):
+            i = index
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                result = services.analyze_image(images[i % len(images)])
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    (latencies if result['model_version'] else errors).append(elapsed)
+                i += 1
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(options['clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(json.dumps({
+            'latencies_ms': latencies,
+            'errors': len(errors),
+            'seconds': time.perf_counter() - started,
+        }))
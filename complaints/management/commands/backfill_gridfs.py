@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints import mongo
+from complaints.models import Complaint
+
+
+def _load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(path, state):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.checkpoint-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+class Command(BaseCommand):
+    help = (
+        'Upload the images of complaints that were never mirrored to GridFS (empty mongo_file_id), '
+        'in parallel, verifying the checksum of every upload. Progress is checkpointed so an '
+        'interrupted run resumes where it stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent uploads')
+        parser.add_argument('--batch-size', type=int, default=200, help='Complaints fetched and checkpointed at a time')
+        parser.add_argument('--checkpoint', default='gridfs_backfill.json', help='Progress file')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+        parser.add_argument('--limit', type=int, default=0, help='Stop after this many complaints (0: all)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the complaints to mirror')
+        parser.add_argument('--include-pending', action='store_true',
+                            help="Also take complaints left 'pending' by a background writer that died")
+
+    def handle(self, *args, **options):
+        if not mongo.is_configured():
+            raise CommandError('MONGO_URI is not set.')
+        state = mongo.health(force=True)
+        if not state['healthy']:
+            raise CommandError(f"MongoDB is not reachable: {state['error']}")
+
+        # Index-friendly: equality on mongo_file_id plus a pk range, served by complaint_mongo_backfill_idx
+        missing = Complaint.objects.filter(mongo_file_id='').exclude(image='')
+        self.include_pending = options['include_pending']
+        if not self.include_pending:
+            # 'pending' complaints are queued for a live background writer
+            missing = missing.exclude(mongo_status='pending')
+        if options['dry_run']:
+            self.stdout.write(f'{missing.count()} complaints to mirror')
+            return
+
+        checkpoint = None if options['restart'] else _load_checkpoint(options['checkpoint'])
+        progress = checkpoint or {'last_pk': 0, 'stored': 0, 'failed': 0}
+        progress.setdefault('skipped', 0)
+        if checkpoint:
+            self.stdout.write(f"Resuming after complaint {progress['last_pk']} "
+                              f"({progress['stored']} stored, {progress['failed']} failed so far)")
+
+        started = time.monotonic()
+        processed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while not options['limit'] or processed < options['limit']:
+                size = options['batch_size']
+                if options['limit']:
+                    size = min(size, options['limit'] - processed)
+                batch = list(missing.filter(pk__gt=progress['last_pk']).order_by('pk')[:size])
+                if not batch:
+                    break
+                for complaint, error in zip(batch, pool.map(self._mirror, batch)):
+                    if error is None:
+                        progress['skipped'] += 1
+                    elif error:
+                        progress['failed'] += 1
+                        self.stderr.write(f'Complaint {complaint.pk}: {error}')
+                    else:
+                        progress['stored'] += 1
+                # Every complaint up to here has been attempted, so a resumed run starts after it
+                progress['last_pk'] = batch[-1].pk
+                _save_checkpoint(options['checkpoint'], progress)
+                processed += len(batch)
+                rate = processed / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"{processed} processed, {progress['stored']} stored, "
+                                  f"{progress['failed']} failed ({rate:.1f}/s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {progress['stored']} stored, {progress['failed']} failed, "
+            f"{progress['skipped']} skipped (already being mirrored). "
+            f"Failed complaints keep mongo_status='failed'; rerun with --restart to retry them."
+        ))
+
+    def _mirror(self, complaint):
+        """Upload one complaint's image; returns an error message, '' when stored, or None when skipped"""
+        # Claim the row so a background writer queued meanwhile is not racing this upload
+        claim = Complaint.objects.filter(pk=complaint.pk, mongo_file_id='')
+        if not self.include_pending:
+            claim = claim.exclude(mongo_status='pending')
+        if not claim.update(mongo_status='pending', mongo_error=''):
+            return None
+        try:
+            file_id = mongo.store_image(complaint, verify=True)
+        except Exception as e:
+            Complaint.objects.filter(pk=complaint.pk).update(mongo_status='failed', mongo_error=str(e)[:255])
+            return str(e)
+        Complaint.objects.filter(pk=complaint.pk).update(mongo_file_id=file_id, mongo_status='stored', mongo_error='')
+        return ''
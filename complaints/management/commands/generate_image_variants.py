@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from complaints.derivatives import is_current, update_variants
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized WebP/JPEG derivatives of complaint images that are missing or out of date.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that are already current')
+        parser.add_argument('--ids', default='', help='Comma-separated complaint ids (default: all)')
+
+    def handle(self, *args, **options):
+        complaints = Complaint.objects.exclude(image='').exclude(image__isnull=True).order_by('pk')
+        if options['ids']:
+            complaints = complaints.filter(pk__in=[int(pk) for pk in options['ids'].split(',') if pk])
+
+        generated = skipped = failed = 0
+        for complaint in complaints.iterator():
+            if is_current(complaint) and not options['force']:
+                skipped += 1
+                continue
+            try:
+                if update_variants(complaint.pk, force=options['force']):
+                    generated += 1
+                else:
+                    skipped += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'Complaint {complaint.pk}: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'Generated {generated}, skipped {skipped}, failed {failed}'))
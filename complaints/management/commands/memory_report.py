@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Fields of /proc/<pid>/smaps_rollup (and of each mapping in /proc/<pid>/smaps), in kB
+_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def _parse_fields(lines):
+    values = dict.fromkeys(_FIELDS, 0)
+    for line in lines:
+        key, _, rest = line.partition(':')
+        if key in values:
+            values[key] += int(rest.split()[0])
+    return values
+
+
+def process_memory(pid, mapping=None):
+    """
+    Memory of one process in kB: RSS, PSS, USS (private pages) and shared pages
+
+    With ``mapping``, only mappings whose path contains that string are counted,
+    e.g. the memory-mapped model checkpoint.
+    """
+    if mapping is None:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            values = _parse_fields(f)
+    else:
+        selected = []
+        keep = False
+        with open(f'/proc/{pid}/smaps') as f:
+            for line in f:
+                first = line.split(None, 1)[0]
+                if '-' in first and not first.endswith(':'):
+                    # Mapping header: "start-end perms offset dev inode [path]"
+                    keep = mapping in line
+                elif keep:
+                    selected.append(line)
+        values = _parse_fields(selected)
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'uss': values['Private_Clean'] + values['Private_Dirty'],
+        'shared': values['Shared_Clean'] + values['Shared_Dirty'],
+    }
+
+
+def gunicorn_pids(master_pid):
+    """The gunicorn master followed by its worker processes"""
+    children = []
+    for task in os.listdir(f'/proc/{master_pid}/task'):
+        with open(f'/proc/{master_pid}/task/{task}/children') as f:
+            children.extend(int(pid) for pid in f.read().split())
+    return [master_pid] + sorted(children)
+
+
+class Command(BaseCommand):
+    help = (
+        'Report per-process RSS, PSS and USS (unique memory) from /proc/<pid>/smaps_rollup. '
+        'Run it against gunicorn while it is under load to check that preloaded model '
+        'weights stay shared: with sharing, worker USS stays well below the model size '
+        'and PSS falls as workers are added.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('pids', nargs='*', type=int, help='Process ids to report')
+        parser.add_argument('--gunicorn', type=int, metavar='MASTER_PID', help='Report a gunicorn master and all its workers')
+        parser.add_argument('--mapping', default=None, help='Only count mappings whose path contains this string (e.g. best.pt)')
+        parser.add_argument('--interval', type=float, default=0, help='Seconds between samples (0: sample once)')
+        parser.add_argument('--count', type=int, default=0, help='Number of samples with --interval (0: until interrupted)')
+
+    def handle(self, *args, **options):
+        if not sys.platform.startswith('linux'):
+            raise CommandError('memory_report reads /proc and only works on Linux.')
+        if not options['pids'] and not options['gunicorn']:
+            raise CommandError('Give process ids or --gunicorn <master pid>.')
+
+        samples = 0
+        try:
+            while True:
+                pids = list(options['pids'])
+                if options['gunicorn']:
+                    pids += gunicorn_pids(options['gunicorn'])
+                self._report(pids, options['mapping'])
+                samples += 1
+                if not options['interval'] or (options['count'] and samples >= options['count']):
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def _report(self, pids, mapping):
+        self.stdout.write(f"{'pid':>8} {'rss MB':>9} {'pss MB':>9} {'uss MB':>9} {'shared MB':>10}")
+        totals = dict.fromkeys(('rss', 'pss', 'uss'), 0)
+        for pid in pids:
+            try:
+                memory = process_memory(pid, mapping)
+            except (FileNotFoundError, ProcessLookupError):
+                self.stdout.write(f'{pid:>8} (exited)')
+                continue
+            except PermissionError:
+                raise CommandError(f'Permission denied reading /proc/{pid}; run as the same user as the workers.')
+            for key in totals:
+                totals[key] += memory[key]
+            self.stdout.write(
+                f"{pid:>8} {memory['rss'] / 1024:>9.1f} {memory['pss'] / 1024:>9.1f} "
+                f"{memory['uss'] / 1024:>9.1f} {memory['shared'] / 1024:>10.1f}"
+            )
+        # Summed PSS is the real footprint of the group; summed RSS double-counts shared pages
+        self.stdout.write(
+            f"{'total':>8} {totals['rss'] / 1024:>9.1f} {totals['pss'] / 1024:>9.1f} {totals['uss'] / 1024:>9.1f}"
+        )
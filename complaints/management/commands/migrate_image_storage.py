@@ -0,0 +1,55 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from complaints.derivatives import delete_variants, update_variants
+from complaints.models import Complaint
+from complaints.storage import image_storage
+
+
+class Command(BaseCommand):
+    help = (
+        'Move complaint images saved under the old flat complaints/ layout into content-addressed, '
+        'sharded storage, rewriting Complaint.image. Identical photos end up stored once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be moved')
+        parser.add_argument('--keep-originals', action='store_true', help='Leave the old files in place')
+        parser.add_argument('--skip-variants', action='store_true',
+                            help='Do not regenerate derivatives now (run generate_image_variants later)')
+
+    def handle(self, *args, **options):
+        storage = image_storage()
+        moved = skipped = missing = 0
+        for complaint in Complaint.objects.exclude(image='').order_by('pk').iterator():
+            old_name = complaint.image.name
+            if storage.is_content_addressed(old_name):
+                skipped += 1
+                continue
+            if not storage.exists(old_name):
+                missing += 1
+                self.stderr.write(f'Complaint {complaint.pk}: {old_name} is missing')
+                continue
+            if options['dry_run']:
+                moved += 1
+                continue
+
+            with storage.open(old_name, 'rb') as f:
+                new_name = storage.save(old_name, File(f, old_name))
+            with transaction.atomic():
+                updated = Complaint.objects.filter(pk=complaint.pk, image=old_name).update(image=new_name, image_variants={})
+            if not updated:
+                # The complaint changed underneath us; give back the reference we just took
+                storage.delete(new_name)
+                continue
+            moved += 1
+            delete_variants(complaint.image_variants)
+            if not options['keep_originals']:
+                # Legacy files have no StoredFile row, so this removes the file itself
+                storage.delete(old_name)
+            if not options['skip_variants']:
+                update_variants(complaint.pk)
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {moved}, already migrated {skipped}, missing {missing}'))
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints import services
+from complaints.inference_server import make_server
+
+
+class Command(BaseCommand):
+    help = 'Load the severity model once and serve predictions to Django workers over a local socket.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--address',
+            default=getattr(settings, 'INFERENCE_SERVER_ADDRESS', '') or 'unix:/tmp/awaaz-inference.sock',
+            help='unix:/path/to.sock or host:port (defaults to INFERENCE_SERVER_ADDRESS)',
+        )
+
+    def handle(self, *args, **options):
+        address = options['address']
+        if not services.warm_up():
+            raise CommandError('Model could not be loaded; refusing to start the inference server.')
+
+        server = make_server(address)
+        self.stdout.write(self.style.SUCCESS(f'Inference server listening on {address}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from complaints.tokens import sweep_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired analysis tokens and release their stored images. Run it periodically '
+        '(e.g. from cron): the sweep done on new analyses stops when analysis traffic does.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Tokens deleted per pass')
+
+    def handle(self, *args, **options):
+        removed = 0
+        while True:
+            swept = sweep_expired_tokens(limit=options['batch_size'])
+            removed += swept
+            if swept < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired analysis tokens'))
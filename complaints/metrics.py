@@ -0,0 +1,186 @@
+"""
+In-process inference metrics in the Prometheus text exposition format.
+
+Counters and latency histograms are kept per process, with no external
+dependency. Under gunicorn each worker reports its own values, so scrape every
+worker, or run the shared inference server, whose process sees all predictions.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; covers a cache hit (~0.1 ms) up to a cold CPU forward pass
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_gauge_callbacks = []
+_registry_lock = threading.Lock()
+
+# Stage timings of the analysis running in the current thread / task
+_current_trace = ContextVar('inference_trace', default=None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    inner = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels
+    )
+    return '{' + inner + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelnames:
+            values[()] = 0
+        for key, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: dict(s, buckets=list(s['buckets'])) for key, s in self._series.items()}
+        for key, s in sorted(series.items()):
+            for bound, count in zip(self.buckets, s['buckets']):
+                lines.append(f'{self.name}_bucket{_format_labels(key + (("le", repr(bound)),))} {count}')
+            lines.append(f'{self.name}_bucket{_format_labels(key + (("le", "+Inf"),))} {s["count"]}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {s["sum"]}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {s["count"]}')
+        return lines
+
+
+def register_gauge(name, documentation, callback, labelname=None):
+    """
+    Report a value computed at scrape time
+
+    ``callback`` returns a number or, with ``labelname``, a dict of label value -> number;
+    None leaves the gauge out of this scrape.
+    """
+    with _registry_lock:
+        _gauge_callbacks.append((name, documentation, callback, labelname))
+
+
+def _collect_gauges():
+    lines = []
+    for name, documentation, callback, labelname in list(_gauge_callbacks):
+        try:
+            value = callback()
+        except Exception:
+            continue
+        if value is None:
+            # Nothing to report yet
+            continue
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} gauge']
+        if labelname is None:
+            lines.append(f'{name} {float(value)}')
+        else:
+            for label, v in sorted(value.items()):
+                lines.append(f'{name}{_format_labels(((labelname, label),))} {float(v)}')
+    return lines
+
+
+def render_prometheus():
+    """All metrics of this process in the Prometheus text format (version 0.0.4)"""
+    lines = []
+    for metric in list(_registry):
+        lines += metric.collect()
+    lines += _collect_gauges()
+    return '\n'.join(lines) + '\n'
+
+
+ANALYZE_REQUESTS = Counter('awaaz_analyze_requests_total', 'Images submitted for severity analysis')
+ANALYZE_FALLBACKS = Counter(
+    'awaaz_analyze_fallbacks_total',
+    'Analyses answered with the fallback prediction, by reason',
+    ('reason',),
+)
+ANALYZE_ERRORS = Counter('awaaz_analyze_errors_total', 'Analyses that raised an unexpected error')
+MODEL_NOT_LOADED = Counter('awaaz_model_not_loaded_total', 'Analyses attempted while no model could be loaded')
+PREDICTIONS = Counter('awaaz_predictions_total', 'Successful predictions by severity', ('severity',))
+ANALYZE_SECONDS = Histogram('awaaz_analyze_seconds', 'End-to-end analysis latency')
+STAGE_SECONDS = Histogram(
+    'awaaz_inference_stage_seconds',
+    'Latency of each inference stage (read, decode, resize, forward, softmax, generate_text, ...)',
+    ('stage',),
+)
+INGEST_IMAGES = Counter('awaaz_ingest_images_total', 'Uploaded images by ingest result (normalized, kept, failed)', ('result',))
+INGEST_BYTES = Counter('awaaz_ingest_bytes_total', 'Bytes of uploaded images before and after ingest normalization', ('stage',))
+MONGO_WRITES = Counter('awaaz_mongo_writes_total', 'GridFS image writes, by result', ('result',))
+MONGO_WRITE_SECONDS = Histogram('awaaz_mongo_write_seconds', 'GridFS write latency, including retries')
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time a block into STAGE_SECONDS and into the current trace, if any"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace[stage] = trace.get(stage, 0.0) + elapsed * 1000
+
+
+@contextmanager
+def trace():
+    """
+    Collect the stage timings (in ms) of one analysis
+
+    Yields the dict that stage_timer fills in; nested traces share the outer one.
+    """
+    outer = _current_trace.get()
+    if outer is not None:
+        yield outer
+        return
+    stages = {}
+    token = _current_trace.set(stages)
+    try:
+        yield stages
+    finally:
+        _current_trace.reset(token)
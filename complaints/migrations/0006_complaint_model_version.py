@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0005_complaint_upvotes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='model_version',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
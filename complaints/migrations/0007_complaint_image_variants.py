@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0006_complaint_model_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='mongo_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='mongo_status',
+            field=models.CharField(blank=True, choices=[('', 'Not mirrored'), ('pending', 'Pending'), ('stored', 'Stored'), ('failed', 'Failed')], default='', max_length=10),
+        ),
+    ]
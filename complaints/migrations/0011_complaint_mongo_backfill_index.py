@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_complaint_mongo_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['mongo_file_id', 'id'], name='complaint_mongo_backfill_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:30
+
+import complaints.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_complaint_mongo_backfill_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='original_image',
+            field=models.FileField(blank=True, storage=complaints.storage.originals_storage, upload_to='originals/'),
+        ),
+    ]
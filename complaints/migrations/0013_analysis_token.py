@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:32
+
+import complaints.storage
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0012_complaint_original_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisToken',
+            fields=[
+                ('token', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('image', models.ImageField(storage=complaints.storage.image_storage, upload_to='complaints/')),
+                ('original_image', models.FileField(blank=True, storage=complaints.storage.originals_storage, upload_to='originals/')),
+                ('severity', models.CharField(max_length=20)),
+                ('confidence', models.FloatField()),
+                ('generated_text', models.TextField(blank=True)),
+                ('model_version', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
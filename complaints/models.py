@@ -1,6 +1,10 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 
+from .storage import image_storage, originals_storage
+
 class Complaint(models.Model):
     SEVERITY_CHOICES = [
         ('minor', 'Minor'),
@@ -13,12 +17,27 @@ class Complaint(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='complaints')
     title = models.CharField(max_length=200)
     description = models.TextField()
-    image = models.ImageField(upload_to='complaints/')
+    image = models.ImageField(upload_to='complaints/', storage=image_storage)
+    # The upload as received, before ingest normalization (only with INGEST_KEEP_ORIGINALS)
+    original_image = models.FileField(upload_to='originals/', storage=originals_storage, blank=True)
     predicted_severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES)
     true_severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES, blank=True, null=True)
     confidence = models.FloatField()
     generated_text = models.TextField(blank=True)
+    model_version = models.CharField(max_length=100, blank=True)
+    # Resized WebP/JPEG renditions of `image` (see complaints/derivatives.py)
+    image_variants = models.JSONField(default=dict, blank=True)
+    MONGO_STATUS_CHOICES = [
+        ('', 'Not mirrored'),
+        ('pending', 'Pending'),
+        ('stored', 'Stored'),
+        ('failed', 'Failed'),
+    ]
+    
     mongo_file_id = models.CharField(max_length=100, blank=True)
+    # GridFS mirroring outcome, written by the background writer in complaints/mongo.py
+    mongo_status = models.CharField(max_length=10, choices=MONGO_STATUS_CHOICES, blank=True, default='')
+    mongo_error = models.CharField(max_length=255, blank=True)
     public = models.BooleanField(default=True)
     location = models.CharField(max_length=200, blank=True)
     is_resolved = models.BooleanField(default=False)
@@ -26,6 +45,12 @@ class Complaint(models.Model):
     resolved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_complaints')
     upvotes = models.ManyToManyField(User, related_name='complaints_upvoted', blank=True)
 
+    class Meta:
+        indexes = [
+            # backfill_gridfs walks complaints with mongo_file_id='' in pk order
+            models.Index(fields=['mongo_file_id', 'id'], name='complaint_mongo_backfill_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.get_true_severity_display() if self.true_severity else self.get_predicted_severity_display()}"
 
@@ -33,6 +58,48 @@ class Complaint(models.Model):
     def upvote_count(self):
         return self.upvotes.count()
 
+class StoredFile(models.Model):
+    """A content-addressed file in media storage and how many rows reference it (see complaints/storage.py)"""
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+class AnalysisToken(models.Model):
+    """An analyzed upload kept server-side until the user posts it (see complaints/tokens.py)"""
+    token = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='analysis_tokens')
+    image = models.ImageField(upload_to='complaints/', storage=image_storage)
+    original_image = models.FileField(upload_to='originals/', storage=originals_storage, blank=True)
+    severity = models.CharField(max_length=20)
+    confidence = models.FloatField()
+    generated_text = models.TextField(blank=True)
+    model_version = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.severity} (expires {self.expires_at:%H:%M:%S})"
+
+class UploadSession(models.Model):
+    """A resumable chunked upload in progress (see complaints/uploads.py)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
 class Comment(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
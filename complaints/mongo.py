@@ -0,0 +1,275 @@
+"""
+Optional MongoDB/GridFS mirroring of complaint images.
+
+One MongoClient (with its connection pool) is created lazily per process and
+shared by every request; it is recreated after a fork, since pymongo clients
+must not cross fork(). Writes never run on the request path: views call
+mirror_to_gridfs(), which marks the complaint 'pending' and hands it to a
+bounded background writer after the transaction commits. The writer retries
+transient errors with backoff and records the outcome in
+``Complaint.mongo_status`` / ``mongo_error`` instead of dropping it.
+
+The same thread pings the server every MONGO_HEALTH_INTERVAL seconds while it
+is idle, so the health gauge never blocks a metrics scrape on a dead server.
+
+``MONGO_URI = 'mongomock://localhost/awaaz'`` runs everything against mongomock
+(for tests and local development without a mongod).
+"""
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+_queue = None
+_writer = None
+_writer_lock = threading.Lock()
+
+# Result of the last health check: (checked_at, healthy, error)
+_health = (0.0, None, '')
+
+_READ_SIZE = 256 * 1024
+
+
+def is_configured():
+    return bool(getattr(settings, 'MONGO_URI', ''))
+
+
+def _new_client(uri):
+    if uri.startswith('mongomock://'):
+        import mongomock
+        import mongomock.gridfs
+
+        mongomock.gridfs.enable_gridfs_integration()
+        return mongomock.MongoClient('mongodb://' + uri[len('mongomock://'):])
+
+    from pymongo import MongoClient
+
+    timeout_ms = getattr(settings, 'MONGO_TIMEOUT_MS', 5000)
+    return MongoClient(
+        uri,
+        maxPoolSize=getattr(settings, 'MONGO_MAX_POOL_SIZE', 10),
+        serverSelectionTimeoutMS=timeout_ms,
+        connectTimeoutMS=timeout_ms,
+        socketTimeoutMS=timeout_ms * 6,
+        retryWrites=True,
+        connect=False,
+    )
+
+
+def get_client():
+    """The process-wide MongoClient, or None when MONGO_URI is unset or pymongo is not installed"""
+    global _client, _client_pid
+    if not is_configured():
+        return None
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                try:
+                    _client = _new_client(settings.MONGO_URI)
+                except ImportError:
+                    logger.warning('MONGO_URI is set but pymongo is not installed')
+                    return None
+                _client_pid = os.getpid()
+    return _client
+
+
+def get_gridfs():
+    client = get_client()
+    if client is None:
+        return None
+    from gridfs import GridFS
+
+    return GridFS(client.get_database())
+
+
+def health(force=False):
+    """
+    Ping the server, at most once per MONGO_HEALTH_INTERVAL seconds unless forced.
+
+    Returns:
+        dict: configured, healthy (None when unconfigured), error and pending writes
+    """
+    global _health
+    checked_at, healthy, error = _health
+    client = get_client()
+    if client is None:
+        return {'configured': is_configured(), 'healthy': None, 'error': '', 'pending': 0}
+    if force or time.monotonic() - checked_at > getattr(settings, 'MONGO_HEALTH_INTERVAL', 30):
+        try:
+            client.admin.command('ping')
+            healthy, error = True, ''
+        except Exception as e:
+            healthy, error = False, str(e)
+        _health = (time.monotonic(), healthy, error)
+    return {'configured': True, 'healthy': healthy, 'error': error, 'pending': _queue.qsize() if _queue else 0}
+
+
+def _record(complaint_id, **fields):
+    from .models import Complaint
+
+    # Queryset update: no post_save, so derivative and storage signals stay quiet
+    Complaint.objects.filter(pk=complaint_id).update(**fields)
+
+
+class ChecksumMismatch(Exception):
+    """Raised when a file read back from GridFS does not match the local image."""
+
+
+def _sha256(chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_image(complaint, verify=False):
+    """
+    Upload a complaint's image to GridFS synchronously.
+
+    The image's SHA-256 is stored in the file's metadata, and a file already
+    uploaded for this complaint with the same checksum (by the background
+    writer, the backfill command, or a run interrupted before it could record
+    the id) is reused instead of uploading a duplicate. With ``verify``, a new
+    upload is read back and compared before it is accepted.
+
+    Returns:
+        str: the GridFS file id
+    """
+    fs = get_gridfs()
+    if fs is None:
+        raise RuntimeError('MongoDB is not configured')
+    with complaint.image.open('rb') as f:
+        sha256 = _sha256(f.chunks())
+        existing = fs.find_one({'metadata.complaint_id': complaint.pk, 'metadata.sha256': sha256})
+        if existing is not None:
+            return str(existing._id)
+        f.seek(0)
+        file_id = fs.put(
+            f,
+            filename=os.path.basename(complaint.image.name),
+            metadata={'complaint_id': complaint.pk, 'storage_name': complaint.image.name, 'sha256': sha256},
+        )
+    if verify:
+        stored = fs.get(file_id)
+        if _sha256(iter(lambda: stored.read(_READ_SIZE), b'')) != sha256:
+            fs.delete(file_id)
+            raise ChecksumMismatch(f'GridFS copy of {complaint.image.name} does not match')
+    return str(file_id)
+
+
+def _write(complaint_id):
+    global _health
+    from .models import Complaint
+
+    complaint = Complaint.objects.filter(pk=complaint_id).first()
+    if complaint is None or not complaint.image:
+        return
+    retries = getattr(settings, 'MONGO_WRITE_RETRIES', 3)
+    start = time.perf_counter()
+    for attempt in range(retries + 1):
+        try:
+            file_id = store_image(complaint)
+        except Exception as e:
+            health(force=True)
+            if attempt == retries:
+                metrics.MONGO_WRITES.inc(result='failed')
+                logger.warning('GridFS write failed', extra={'complaint_id': complaint_id, 'error': str(e)})
+                _record(complaint_id, mongo_status='failed', mongo_error=str(e)[:255])
+                return
+            time.sleep(min(30, 0.5 * 2 ** attempt))
+        else:
+            _health = (time.monotonic(), True, '')
+            metrics.MONGO_WRITES.inc(result='stored')
+            metrics.MONGO_WRITE_SECONDS.observe(time.perf_counter() - start)
+            _record(complaint_id, mongo_file_id=file_id, mongo_status='stored', mongo_error='')
+            return
+
+
+def _writer_loop():
+    health(force=True)
+    while True:
+        try:
+            complaint_id = _queue.get(timeout=getattr(settings, 'MONGO_HEALTH_INTERVAL', 30))
+        except queue.Empty:
+            health(force=True)
+            continue
+        try:
+            _write(complaint_id)
+        except Exception:
+            logger.exception('GridFS writer error', extra={'complaint_id': complaint_id})
+        finally:
+            _queue.task_done()
+
+
+def _get_queue():
+    global _queue, _writer
+    if _writer is None or not _writer.is_alive():
+        with _writer_lock:
+            if _writer is None or not _writer.is_alive():
+                if _queue is None:
+                    _queue = queue.Queue(maxsize=getattr(settings, 'MONGO_WRITE_QUEUE_SIZE', 100))
+                _writer = threading.Thread(target=_writer_loop, name='gridfs-writer', daemon=True)
+                _writer.start()
+    return _queue
+
+
+def _enqueue(complaint_id):
+    try:
+        _get_queue().put_nowait(complaint_id)
+    except queue.Full:
+        metrics.MONGO_WRITES.inc(result='dropped')
+        _record(complaint_id, mongo_status='failed', mongo_error='GridFS write queue full')
+
+
+def mirror_to_gridfs(complaint):
+    """
+    Queue a complaint's image for GridFS once the current transaction commits.
+
+    Returns:
+        bool: False when MongoDB is not configured
+    """
+    if not is_configured():
+        return False
+    _record(complaint.pk, mongo_status='pending', mongo_error='')
+    complaint.mongo_status = 'pending'
+    complaint_id = complaint.pk
+    transaction.on_commit(lambda: _enqueue(complaint_id))
+    return True
+
+
+def flush(timeout=None):
+    """Wait until queued writes are done (tests, management commands); True if the queue drained"""
+    if _queue is None:
+        return True
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if deadline is not None and time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def _last_health():
+    """The writer thread's last ping result, without pinging; None until the first one"""
+    # Starts the writer (and its idle pings) in a worker that has not written yet
+    _get_queue()
+    return _health[1]
+
+
+if is_configured():
+    metrics.register_gauge('awaaz_mongo_pending_writes', 'GridFS writes waiting in the background queue',
+                           lambda: _queue.qsize() if _queue else 0)
+    metrics.register_gauge('awaaz_mongo_healthy', 'Whether the last MongoDB ping succeeded', _last_health)
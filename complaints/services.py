@@ -1,96 +1,670 @@
-import torch
-import torch.nn.functional as F
-from PIL import Image
-import torchvision.transforms as transforms
+import gc
+import logging
+import os
+import threading
+import time
 import random
-from src.models.model import PotholeSeverityModel
+from contextlib import contextmanager
+from django.conf import settings
+from src.models.registry import DEFAULT_CHECKPOINT, DEFAULT_ROOT, resolve_model
+from src.utils.prediction_cache import PredictionCache, checkpoint_version, image_key
+from . import metrics
+from .batching import InferenceBatcher
+from .metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Class mapping: 0=good, 1=minor, 2=moderate, 3=severe
+CLASS_NAMES = ['good', 'minor', 'moderate', 'severe']
+
+# torch, torchvision and PIL are imported on first inference, not with this
+# module: views import it, and migrate/shell/admin-only processes should not pay
+# for the ML stack (scripts/check_import_time.py guards this)
 
 # Global model instance
 _model = None
-_device = torch.device('mps' if torch.backends.mps.is_available() else 'cuda' if torch.cuda.is_available() else 'cpu')
+_model_version = ''
+_model_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_reload_state = {'checked': 0.0, 'running': False}
+_device = None
+
+# torch thread settings are applied once per process; the semaphore caps
+# concurrent inferences (INFERENCE_MAX_CONCURRENCY)
+_runtime_configured = False
+_runtime_lock = threading.Lock()
+_inference_slots = None
+
+# Shared batcher, created on first use when INFERENCE_BATCHING is enabled
+_batcher = None
+_batcher_lock = threading.Lock()
+
+# Prediction cache keyed by image content + model version, created on first use
+_prediction_cache = None
+_prediction_cache_lock = threading.Lock()
+
+# Inference cascade: a small screening model answers confident cases and
+# escalates the rest to the full model (INFERENCE_CASCADE)
+_screen_model = None
+_screen_version = ''
+_screen_lock = threading.Lock()
+_cascade_counts = {'screened': 0, 'exited_early': 0, 'escalated': 0}
+_cascade_counts_lock = threading.Lock()
+
+# Warm-up state, reported by the readiness endpoint
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+_warmup_seconds = None
+
+def _get_device():
+    global _device
+    if _device is None:
+        from src.models.backends import default_device
+        _device = default_device()
+    return _device
+
+def _resolve_model():
+    """
+    Pick the artifact to serve
+    
+    INFERENCE_MODEL_PATH pins a specific artifact. Otherwise the active version of
+    the model registry (MODEL_REGISTRY_DIR) is served, falling back to
+    checkpoints/best.pt when nothing has been published yet.
+    
+    Returns:
+        tuple: (path, backend, version)
+    """
+    backend = getattr(settings, 'INFERENCE_BACKEND', 'eager')
+    pinned = getattr(settings, 'INFERENCE_MODEL_PATH', '')
+    if pinned:
+        return pinned, backend, checkpoint_version(pinned) if os.path.exists(pinned) else ''
+    return resolve_model(getattr(settings, 'MODEL_REGISTRY_DIR', DEFAULT_ROOT), DEFAULT_CHECKPOINT, backend)
+
+def _load_resolved():
+    """Load whatever _resolve_model picks; returns (model, version) or (None, '')"""
+    checkpoint_path, backend, version = _resolve_model()
+    if not os.path.exists(checkpoint_path):
+        logger.warning("Model checkpoint not found", extra={'path': checkpoint_path})
+        return None, ''
+    from src.models.backends import load_inference_model
+    model = load_inference_model(
+        checkpoint_path,
+        backend=backend,
+        device=_get_device(),
+        intra_op_threads=getattr(settings, 'INFERENCE_INTRA_OP_THREADS', 0),
+    )
+    logger.info("Model loaded", extra={'model_version': version, 'backend': backend})
+    return model, version
 
 def load_model():
-    """Load the trained model"""
-    global _model
+    """
+    Load the trained model
+    
+    INFERENCE_BACKEND selects eager PyTorch ('eager', the default) or a compiled
+    artifact ('torchscript' / 'onnx') exported with `python -m src.models.export`;
+    registry versions carry their own backend. Once loaded, the registry's ACTIVE
+    pointer is checked every MODEL_RELOAD_INTERVAL seconds and a new version is
+    swapped in on a background thread (see reload_model).
+    """
+    global _model, _model_version
     if _model is None:
-        try:
-            import os
-            checkpoint_path = 'checkpoints/best.pt'
-            if not os.path.exists(checkpoint_path):
-                print(f"Model checkpoint not found at {checkpoint_path}")
-                return None
-            
-            checkpoint = torch.load(checkpoint_path, map_location=_device)
-            _model = PotholeSeverityModel(num_classes=4, pretrained=False)
-            _model.load_state_dict(checkpoint['model_state'])
-            _model.to(_device)
-            _model.eval()
-            print("Model loaded successfully")
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            _model = None
+        configure_runtime()
+        with _model_lock:
+            if _model is None:
+                try:
+                    _model, _model_version = _load_resolved()
+                except Exception:
+                    logger.exception("Error loading model")
+                    _model = None
+                _reload_state['checked'] = time.monotonic()
+        return _model
+    _maybe_start_reload()
     return _model
 
-def predict_and_generate_text(image_path):
+def configure_runtime():
     """
-    Predict pothole severity and generate complaint text
+    Apply the torch thread settings, once per process, before the first inference
+    
+    INFERENCE_INTRA_OP_THREADS and INFERENCE_INTER_OP_THREADS (0 keeps torch's
+    defaults) keep several workers on one box from each starting a thread per
+    core. INFERENCE_MAX_CONCURRENCY caps how many requests run the model at once
+    in this process; the rest wait their turn instead of splitting the cores.
+    `python manage.py autotune_inference` finds good values for a machine.
+    """
+    global _runtime_configured, _inference_slots
+    if _runtime_configured:
+        return
+    import torch
+    with _runtime_lock:
+        if _runtime_configured:
+            return
+        intra_op_threads = getattr(settings, 'INFERENCE_INTRA_OP_THREADS', 0)
+        inter_op_threads = getattr(settings, 'INFERENCE_INTER_OP_THREADS', 0)
+        max_concurrency = getattr(settings, 'INFERENCE_MAX_CONCURRENCY', 0)
+        if intra_op_threads > 0:
+            torch.set_num_threads(intra_op_threads)
+        if inter_op_threads > 0:
+            try:
+                torch.set_num_interop_threads(inter_op_threads)
+            except RuntimeError:
+                # Only possible before any inter-op parallel work has started
+                logger.warning("Inter-op thread pool already started; INFERENCE_INTER_OP_THREADS ignored")
+        if max_concurrency > 0:
+            _inference_slots = threading.BoundedSemaphore(max_concurrency)
+        _runtime_configured = True
+        logger.info("Inference runtime configured", extra={
+            'intra_op_threads': torch.get_num_threads(),
+            'inter_op_threads': torch.get_num_interop_threads(),
+            'max_concurrency': max_concurrency,
+        })
+
+def _get_inference_slots():
+    """The INFERENCE_MAX_CONCURRENCY semaphore, or None when concurrency is unlimited"""
+    configure_runtime()
+    return _inference_slots
+
+@contextmanager
+def _inference_slot():
+    """Hold one INFERENCE_MAX_CONCURRENCY slot (waiting is timed as 'queue'); a no-op when unlimited"""
+    slots = _get_inference_slots()
+    if slots is None:
+        yield
+        return
+    with stage_timer('queue'):
+        slots.acquire()
+    try:
+        yield
+    finally:
+        slots.release()
+
+def current_model():
+    """The loaded model and its version, read together so a concurrent swap cannot mix them"""
+    load_model()
+    with _model_lock:
+        return _model, _model_version
+
+def reload_model():
+    """
+    Swap in the registry's active version if it differs from the loaded one
+    
+    The new model is loaded while the old one keeps serving. The swap itself is
+    a reference assignment under _model_lock, so requests already running finish
+    on the old model, and its weights are freed once the last of them drops its
+    reference.
     
     Returns:
-        tuple: (severity, confidence, generated_text)
+        bool: True if a new version was swapped in
     """
+    global _model, _model_version
+    checkpoint_path, _, version = _resolve_model()
+    if not version or version == _model_version or not os.path.exists(checkpoint_path):
+        return False
     try:
-        # Check if image file exists
-        import os
-        if not os.path.exists(image_path):
-            print(f"Image file not found: {image_path}")
-            return 'moderate', 0.5, "Image file not found. Please try again."
-        
-        model = load_model()
-        if model is None:
-            print("Model could not be loaded, using fallback prediction")
-            return 'moderate', 0.5, "Unable to analyze image. Please try again."
-        
-        # Load and preprocess image
-        image = Image.open(image_path).convert('RGB')
-        transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
-        image_tensor = transform(image).unsqueeze(0).to(_device)
-        
-        # Get prediction
-        with torch.no_grad():
-            outputs = model(image_tensor)
+        model, version = _load_resolved()
+    except Exception:
+        logger.exception("Error loading model version, keeping the current one", extra={'model_version': version, 'current_version': _model_version})
+        return False
+    if model is None:
+        return False
+    with _model_lock:
+        previous, previous_version = _model, _model_version
+        _model, _model_version = model, version
+    del previous
+    gc.collect()
+    if _get_device().type == 'cuda':
+        import torch
+        torch.cuda.empty_cache()
+    logger.info("Switched model", extra={'previous_version': previous_version, 'model_version': version})
+    return True
+
+def _reload_worker():
+    try:
+        reload_model()
+    finally:
+        _reload_state['running'] = False
+
+def _maybe_start_reload():
+    """Start a background reload check if MODEL_RELOAD_INTERVAL has elapsed since the last one"""
+    interval = getattr(settings, 'MODEL_RELOAD_INTERVAL', 10)
+    now = time.monotonic()
+    if interval <= 0 or now - _reload_state['checked'] < interval:
+        return
+    with _reload_lock:
+        if _reload_state['running'] or now - _reload_state['checked'] < interval:
+            return
+        _reload_state['checked'] = now
+        _reload_state['running'] = True
+    threading.Thread(target=_reload_worker, name='model-reload', daemon=True).start()
+
+def _preprocess(image):
+    """Decode an image file path or encoded bytes into a normalised (3, 224, 224) tensor"""
+    from src.utils.preprocessing import IMAGE_SIZE, get_transform, open_image
+    with stage_timer('decode'):
+        decoded = open_image(image, IMAGE_SIZE)
+    with stage_timer('resize'):
+        return get_transform(IMAGE_SIZE)(decoded)
+
+def _forward(model, batch, stage='forward'):
+    """
+    Run one forward pass over a (N, 3, 224, 224) batch, timed as ``stage``.
+
+    Returns:
+        list: one (predicted_class, confidence) pair per image
+    """
+    import torch
+    import torch.nn.functional as F
+    with torch.no_grad():
+        with stage_timer(stage):
+            outputs = model(batch.to(_get_device()))
+        with stage_timer('softmax'):
             probabilities = F.softmax(outputs, dim=1)
-            confidence, predicted = torch.max(probabilities, 1)
+            confidences, predicted = torch.max(probabilities, 1)
+            return list(zip(predicted.tolist(), confidences.tolist()))
+
+def _run_batch(items):
+    """
+    Batch callback for InferenceBatcher: classify (model, tensor) pairs together.
+
+    Requests that arrive around a hot reload may carry different models; each
+    model only sees its own requests, so results stay consistent with the
+    version they are cached and reported under.
+    """
+    import torch
+    groups = {}
+    for index, (model, tensor) in enumerate(items):
+        groups.setdefault(id(model), (model, []))[1].append((index, tensor))
+    results = [None] * len(items)
+    for model, entries in groups.values():
+        # One concurrency slot per forward pass, so waiting requests can still join the batch
+        with _inference_slot():
+            outputs = _forward(model, torch.stack([tensor for _, tensor in entries]))
+        for (index, _), output in zip(entries, outputs):
+            results[index] = output
+    return results
+
+def _get_batcher():
+    """Return the shared InferenceBatcher, or None when batching is disabled"""
+    global _batcher
+    if not getattr(settings, 'INFERENCE_BATCHING', False):
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = InferenceBatcher(
+                    _run_batch,
+                    max_batch_size=getattr(settings, 'INFERENCE_BATCH_SIZE', 8),
+                    max_wait_ms=getattr(settings, 'INFERENCE_BATCH_WAIT_MS', 10),
+                )
+    return _batcher
+
+def _classify(model, image_tensor):
+    """
+    Classify a single preprocessed image, going through the batcher when enabled
+
+    The INFERENCE_MAX_CONCURRENCY slot covers the forward pass: the batcher takes
+    one per batch, so requests waiting for a batch do not hold one.
+    """
+    batcher = _get_batcher()
+    if batcher is not None:
+        # Queueing plus the shared forward pass; the batch itself is timed as 'forward'
+        with stage_timer('batch'):
+            return batcher.submit((model, image_tensor))
+    with _inference_slot():
+        return _forward(model, image_tensor.unsqueeze(0))[0]
+
+def load_screen_model():
+    """Load the cascade's screening model from INFERENCE_SCREEN_MODEL_PATH"""
+    global _screen_model, _screen_version
+    if _screen_model is None:
+        with _screen_lock:
+            if _screen_model is None:
+                screen_path = getattr(settings, 'INFERENCE_SCREEN_MODEL_PATH', '')
+                if not screen_path or not os.path.exists(screen_path):
+                    logger.warning("Screening model not found", extra={'path': screen_path})
+                    return None
+                try:
+                    _screen_version = checkpoint_version(screen_path)
+                    from src.models.backends import load_inference_model
+                    _screen_model = load_inference_model(screen_path, backend='eager', device=_get_device())
+                    logger.info("Screening model loaded", extra={'model_version': _screen_version})
+                except Exception:
+                    logger.exception("Error loading screening model")
+                    _screen_model = None
+    return _screen_model
+
+def _screen(image_tensor):
+    """
+    First cascade stage
+    
+    Returns:
+        tuple: (predicted_class, confidence) if the screening model is confident
+        enough to answer on its own, otherwise None (escalate to the full model)
+    """
+    screen = load_screen_model()
+    if screen is None:
+        return None
+    with _inference_slot():
+        predicted_class, confidence = _forward(screen, image_tensor.unsqueeze(0), stage='screen_forward')[0]
+    exit_classes = getattr(settings, 'INFERENCE_SCREEN_EXIT_CLASSES', ['good', 'severe'])
+    exited = CLASS_NAMES[predicted_class] in exit_classes and confidence >= getattr(settings, 'INFERENCE_SCREEN_THRESHOLD', 0.9)
+    with _cascade_counts_lock:
+        _cascade_counts['screened'] += 1
+        _cascade_counts['exited_early' if exited else 'escalated'] += 1
+    return (predicted_class, confidence) if exited else None
+
+def cascade_stats():
+    """How many requests the screening stage answered vs escalated"""
+    with _cascade_counts_lock:
+        stats = dict(_cascade_counts)
+    stats['exit_rate'] = stats['exited_early'] / stats['screened'] if stats['screened'] else 0.0
+    return stats
+
+def model_version(base=None):
+    """
+    Version string of the model answering predictions
+    
+    This is the registry version (or checkpoint content hash) of the loaded model,
+    or of ``base`` when given, plus the screening stage when the cascade is enabled.
+    """
+    base = _model_version if base is None else base
+    if getattr(settings, 'INFERENCE_CASCADE', False) and load_screen_model() is not None:
+        return f"{base}+{_screen_version}@{getattr(settings, 'INFERENCE_SCREEN_THRESHOLD', 0.9)}"
+    return base
+
+def get_prediction_cache():
+    """Return the shared PredictionCache, or None when caching is disabled"""
+    global _prediction_cache
+    max_entries = getattr(settings, 'PREDICTION_CACHE_SIZE', 1024)
+    sqlite_path = getattr(settings, 'PREDICTION_CACHE_PATH', '')
+    if max_entries <= 0 and not sqlite_path:
+        return None
+    if _prediction_cache is None:
+        with _prediction_cache_lock:
+            if _prediction_cache is None:
+                _prediction_cache = PredictionCache(max_entries=max_entries, sqlite_path=sqlite_path or None)
+    return _prediction_cache
+
+def prediction_cache_stats():
+    """Hit/miss counters of the prediction cache (empty when disabled)"""
+    cache = get_prediction_cache()
+    return cache.stats() if cache is not None else {}
+
+def _model_info():
+    return {_model_version: 1} if _model is not None else {}
+
+metrics.register_gauge('awaaz_model_loaded', 'Whether this process has a model loaded', lambda: _model is not None)
+metrics.register_gauge('awaaz_model_info', 'Version of the loaded model', _model_info, labelname='version')
+metrics.register_gauge('awaaz_prediction_cache', 'Prediction cache counters and size', prediction_cache_stats, labelname='stat')
+metrics.register_gauge('awaaz_cascade', 'Inference cascade counters', cascade_stats, labelname='stat')
+
+def predict_label(model, image, version=None):
+    """
+    Classify one image (file path or encoded bytes) with the loaded model
+    
+    Repeated images are answered from the prediction cache without touching the model.
+    With INFERENCE_CASCADE enabled the screening model answers confident cases first.
+    Pass the ``version`` returned alongside ``model`` by current_model() so cache
+    entries stay keyed to the model that produced them across a hot reload.
+    
+    Returns:
+        tuple: (severity, confidence)
+    """
+    image = read_image_bytes(image)
+    cache = get_prediction_cache()
+    key = image_key(image, model_version(version)) if cache is not None else None
+    if cache is not None:
+        with stage_timer('cache_lookup'):
+            cached = cache.get(key)
+        if cached is not None:
+            return cached[0], cached[1]
+    
+    image_tensor = _preprocess(image)
+    screened = _screen(image_tensor) if getattr(settings, 'INFERENCE_CASCADE', False) else None
+    if screened is not None:
+        predicted_class, confidence = screened
+    else:
+        predicted_class, confidence = _classify(model, image_tensor)
+    predicted_label = CLASS_NAMES[predicted_class]
+    
+    # Apply confidence threshold for good roads
+    confidence_threshold = getattr(settings, 'INFERENCE_GOOD_THRESHOLD', 0.6)
+    if predicted_label == 'good' and confidence < confidence_threshold:
+        predicted_label = 'minor'  # Default to minor if confidence is low for good roads
+    
+    if cache is not None:
+        cache.set(key, [predicted_label, confidence])
+    return predicted_label, confidence
+
+def warm_up(iterations=None):
+    """
+    Load the model and run a few dummy forward passes at the serving resolution
+    
+    The first passes are much slower than steady state (weight paging, allocator
+    and kernel selection), so doing them up front keeps that cost off the first
+    citizen's request. The duration is recorded for the readiness endpoint.
+    
+    Returns:
+        bool: True if the model is loaded and warm
+    """
+    global _warmup_seconds
+    import torch
+    from src.utils.preprocessing import IMAGE_SIZE
+    if iterations is None:
+        iterations = getattr(settings, 'INFERENCE_WARMUP_ITERATIONS', 3)
+    start = time.perf_counter()
+    model = load_model()
+    if model is None:
+        return False
+    batch_sizes = {1}
+    if getattr(settings, 'INFERENCE_BATCHING', False):
+        batch_sizes.add(getattr(settings, 'INFERENCE_BATCH_SIZE', 8))
+    for batch_size in sorted(batch_sizes):
+        dummy = torch.zeros(batch_size, 3, IMAGE_SIZE, IMAGE_SIZE)
+        for _ in range(iterations):
+            with torch.no_grad():
+                model(dummy.to(_get_device()))
+    screen = load_screen_model() if getattr(settings, 'INFERENCE_CASCADE', False) else None
+    if screen is not None:
+        for _ in range(iterations):
+            with torch.no_grad():
+                screen(torch.zeros(1, 3, IMAGE_SIZE, IMAGE_SIZE).to(_get_device()))
+    _warmup_seconds = time.perf_counter() - start
+    logger.info("Model warm-up finished", extra={'warmup_seconds': round(_warmup_seconds, 3)})
+    return True
+
+def preload():
+    """
+    Load the model(s) in the gunicorn master before it forks workers
+    
+    Workers then share the weight pages copy-on-write instead of each loading a
+    private copy. No forward pass runs here, so no intra-op thread pools exist
+    when the master forks; each worker warms up on its own (see gunicorn.conf.py).
+    gc.freeze() moves everything loaded so far out of the collector's reach, so
+    collections in the workers do not write to (and un-share) those pages.
+    
+    Returns:
+        bool: True if the model loaded
+    """
+    model = load_model()
+    if getattr(settings, 'INFERENCE_CASCADE', False):
+        load_screen_model()
+    gc.collect()
+    gc.freeze()
+    return model is not None
+
+def start_warm_up():
+    """Run warm_up on a background thread, at most once per process"""
+    global _warmup_thread
+    if getattr(settings, 'INFERENCE_SERVER_ADDRESS', ''):
+        # The inference server holds the model and warms itself up
+        return
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, name='inference-warmup', daemon=True)
+            _warmup_thread.start()
+
+def prepare_serving():
+    """
+    Get the model ready in a server process; called from awaaz_web/wsgi.py and asgi.py
+
+    Only server entrypoints call this, so migrate, shell and other management
+    commands never import torch or load the model. With INFERENCE_PRELOAD
+    (gunicorn --preload, see gunicorn.conf.py) it runs once in the master, which
+    loads the weights for all workers to share; warm-up then happens per worker
+    after the fork. Otherwise, with INFERENCE_WARMUP, the model is loaded and
+    warmed in the background so the first analyze request after a deploy or
+    worker recycle does not pay for it.
+    """
+    if getattr(settings, 'INFERENCE_PRELOAD', False):
+        preload()
+    elif getattr(settings, 'INFERENCE_WARMUP', False):
+        start_warm_up()
+
+def readiness():
+    """
+    Report whether this process can serve predictions without a cold start
+    
+    Returns:
+        dict: {'ready', 'model_loaded', 'warmup_seconds', ...}
+    """
+    address = getattr(settings, 'INFERENCE_SERVER_ADDRESS', '')
+    if address:
+        from .inference_server import InferenceServerError, ping
+        try:
+            status = ping(address, timeout=getattr(settings, 'INFERENCE_SERVER_TIMEOUT', 5.0))
+        except InferenceServerError:
+            status = {}
+        model_loaded = bool(status.get('model_loaded'))
+        return {
+            'ready': model_loaded,
+            'model_loaded': model_loaded,
+            'inference_server': address,
+            'model_version': status.get('model_version', ''),
+        }
+    return {
+        'ready': _model is not None and _warmup_seconds is not None,
+        'model_loaded': _model is not None,
+        'warmup_seconds': _warmup_seconds,
+        'backend': getattr(settings, 'INFERENCE_BACKEND', 'eager'),
+        'model_version': _model_version,
+    }
+
+def read_image_bytes(image):
+    """
+    Return the encoded bytes of an image given as bytes, a file path or a file-like object
+    
+    Django UploadedFiles are read straight from their in-memory (or already
+    spooled) buffer, so analysis never needs its own copy on disk. The file
+    position is rewound afterwards so the upload can still be saved.
+    """
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    if isinstance(image, (str, os.PathLike)):
+        with open(image, 'rb') as f:
+            return f.read()
+    if hasattr(image, 'seek'):
+        image.seek(0)
+    data = b''.join(image.chunks()) if hasattr(image, 'chunks') else image.read()
+    if hasattr(image, 'seek'):
+        image.seek(0)
+    return data
+
+def _predict_remote(image_bytes):
+    """Classify through the shared inference server configured in INFERENCE_SERVER_ADDRESS"""
+    from .inference_server import predict_remote
+    return predict_remote(
+        settings.INFERENCE_SERVER_ADDRESS,
+        image_bytes,
+        timeout=getattr(settings, 'INFERENCE_SERVER_TIMEOUT', 5.0),
+    )
+
+def _fallback(message, reason, stages=None):
+    metrics.ANALYZE_FALLBACKS.inc(reason=reason)
+    logger.warning("Using fallback prediction", extra={'reason': reason, 'stages_ms': stages})
+    return {'severity': 'moderate', 'confidence': 0.5, 'generated_text': message, 'model_version': ''}
+
+def analyze_image(image):
+    """
+    Predict pothole severity, generate complaint text and report the model version
+    
+    Each stage (read, decode, resize, forward, softmax, generate_text, ...) is
+    timed into the metrics histograms, and the per-request breakdown is logged
+    with the prediction.
+    
+    Args:
+        image: encoded bytes, a file path, or a file-like object such as a Django UploadedFile
+    
+    Returns:
+        dict: {'severity', 'confidence', 'generated_text', 'model_version'}; the
+        version is empty when the fallback prediction was used
+    """
+    metrics.ANALYZE_REQUESTS.inc()
+    start = time.perf_counter()
+    with metrics.trace() as stages:
+        try:
+            # Check if image file exists
+            if isinstance(image, (str, os.PathLike)) and not os.path.exists(image):
+                return _fallback("Image file not found. Please try again.", 'image_not_found', stages)
+            with stage_timer('read'):
+                image_bytes = read_image_bytes(image)
             
-            confidence = confidence.item()
-            predicted_class = predicted.item()
+            if getattr(settings, 'INFERENCE_SERVER_ADDRESS', ''):
+                from .inference_server import InferenceServerError
+                try:
+                    with stage_timer('remote'):
+                        predicted_label, confidence, version = _predict_remote(image_bytes)
+                except InferenceServerError as e:
+                    logger.warning("Inference server unavailable", extra={'error': str(e)})
+                    return _fallback("Unable to analyze image. Please try again.", 'server_unavailable', stages)
+            else:
+                with stage_timer('load_model'):
+                    model, version = current_model()
+                if model is None:
+                    metrics.MODEL_NOT_LOADED.inc()
+                    return _fallback("Unable to analyze image. Please try again.", 'model_not_loaded', stages)
+                predicted_label, confidence = predict_label(model, image_bytes, version)
+                version = model_version(version)
             
-            # Class mapping: 0=good, 1=minor, 2=moderate, 3=severe
-            class_names = ['good', 'minor', 'moderate', 'severe']
-            predicted_label = class_names[predicted_class]
-        
-        # Apply confidence threshold for good roads
-        confidence_threshold = 0.6
-        if predicted_label == 'good' and confidence < confidence_threshold:
-            predicted_label = 'minor'  # Default to minor if confidence is low for good roads
-        
-        # Generate text based on prediction
-        if predicted_label == 'good':
-            generated_text = generate_good_road_text()
-        else:
-            generated_text = generate_complaint_text(predicted_label, confidence)
-        
-        print(f"Prediction successful: {predicted_label} (confidence: {confidence:.2f})")
-        return predicted_label, confidence, generated_text
-        
-    except Exception as e:
-        print(f"Error processing image {image_path}: {e}")
-        import traceback
-        traceback.print_exc()
-        return 'moderate', 0.5, "Error processing image. Please try again."
+            # Generate text based on prediction
+            with stage_timer('generate_text'):
+                if predicted_label == 'good':
+                    generated_text = generate_good_road_text()
+                else:
+                    generated_text = generate_complaint_text(predicted_label, confidence)
+            
+            metrics.PREDICTIONS.inc(severity=predicted_label)
+            logger.info("Prediction successful", extra={
+                'severity': predicted_label,
+                'confidence': round(confidence, 4),
+                'model_version': version,
+                'stages_ms': {stage: round(ms, 3) for stage, ms in stages.items()},
+            })
+            return {
+                'severity': predicted_label,
+                'confidence': confidence,
+                'generated_text': generated_text,
+                'model_version': version,
+            }
+            
+        except Exception:
+            metrics.ANALYZE_ERRORS.inc()
+            logger.exception("Error processing image", extra={'image': getattr(image, 'name', '')})
+            return _fallback("Error processing image. Please try again.", 'error', stages)
+        finally:
+            metrics.ANALYZE_SECONDS.observe(time.perf_counter() - start)
+
+def predict_and_generate_text(image):
+    """
+    Predict pothole severity and generate complaint text
+    
+    Args:
+        image: encoded bytes, a file path, or a file-like object such as a Django UploadedFile
+    
+    Returns:
+        tuple: (severity, confidence, generated_text)
+    """
+    result = analyze_image(image)
+    return result['severity'], result['confidence'], result['generated_text']
 
 def generate_good_road_text():
     """Generate text for images of good roads"""
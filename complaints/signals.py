@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .derivatives import is_current, release_variants, schedule_variants
+from .ingest import normalize_image
+from .models import AnalysisToken, Complaint
+
+
+@receiver(pre_save, sender=Complaint)
+def normalize_new_image(sender, instance, raw=False, **kwargs):
+    """Downscale, orient and strip a newly assigned image before the storage sees it"""
+    if raw or not getattr(settings, 'INGEST_NORMALIZE', True):
+        return
+    if not instance.image or instance.image._committed:
+        return
+    upload = instance.image.file
+    normalized = normalize_image(upload)
+    # A replaced image's raw upload no longer belongs to this complaint (post_save releases it)
+    instance.original_image = None
+    if normalized is upload:
+        return
+    if getattr(settings, 'INGEST_KEEP_ORIGINALS', False):
+        instance.original_image = File(upload, name=instance.image.name)
+    instance.image = normalized
+
+
+@receiver(pre_save, sender=Complaint)
+def remember_previous_image(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None or (update_fields is not None and not {'image', 'original_image'} & set(update_fields)):
+        return
+    instance._previous_image, instance._previous_original = Complaint.objects.filter(pk=instance.pk).values_list(
+        'image', 'original_image').first() or (None, None)
+
+
+@receiver(post_save, sender=Complaint)
+def queue_image_variants(sender, instance, raw=False, **kwargs):
+    """Render thumbnails once the new or replaced image is committed"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_image', None)
+    if previous and previous != instance.image.name:
+        # The image was replaced: drop this complaint's reference to the old file
+        instance.image.storage.delete(previous)
+    previous_original = getattr(instance, '_previous_original', None)
+    if previous_original and previous_original != instance.original_image.name:
+        instance.original_image.storage.delete(previous_original)
+    instance._previous_image = instance.image.name
+    instance._previous_original = instance.original_image.name
+    if not instance.image or is_current(instance):
+        return
+    transaction.on_commit(lambda: schedule_variants(instance.pk))
+
+
+@receiver(post_delete, sender=Complaint)
+def release_image(sender, instance, **kwargs):
+    """Drop the complaint's reference to its stored image; shared files stay until the last one goes"""
+    if instance.image:
+        instance.image.storage.delete(instance.image.name)
+    if instance.original_image:
+        instance.original_image.storage.delete(instance.original_image.name)
+    release_variants(instance.image_variants)
+
+
+@receiver(post_delete, sender=AnalysisToken)
+def release_token_images(sender, instance, **kwargs):
+    """Drop an unclaimed token's references, however it is deleted (sweep, user deletion, admin)"""
+    if instance.image:
+        instance.image.storage.delete(instance.image.name)
+    if instance.original_image:
+        instance.original_image.storage.delete(instance.original_image.name)
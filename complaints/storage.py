@@ -0,0 +1,132 @@
+"""
+Content-addressed, sharded storage for complaint images.
+
+An upload named ``complaints/IMG_1234.JPEG`` is stored as
+
+    complaints/3f/a2/3fa2...e9.jpg
+
+where the name is the SHA-256 of its bytes. Two levels of 256-way shards keep
+every directory small at millions of images, and uploading the same photo twice
+stores it once. StoredFile rows count the references to each file; delete()
+drops one reference and only removes the file when the last one is gone.
+
+Files saved before this storage was introduced have no StoredFile row and are
+deleted outright. `python manage.py migrate_image_storage` moves them over.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+_EXTENSIONS = {'.jpeg': '.jpg', '.jpe': '.jpg'}
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, shard_depth=2, shard_width=2, **kwargs):
+        super().__init__(**kwargs)
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+        shards = '/'.join([f'[0-9a-f]{{{shard_width}}}'] * shard_depth)
+        self._pattern = re.compile(rf'(?:^|/){shards}/[0-9a-f]{{64}}(?:\.\w+)?$')
+
+    def is_content_addressed(self, name):
+        return bool(self._pattern.search(name or ''))
+
+    def content_name(self, name, digest):
+        """``<upload_to>/<shards>/<sha256><ext>`` for a file originally called `name`"""
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        extension = _EXTENSIONS.get(extension, extension)
+        shards = [digest[i * self.shard_width:(i + 1) * self.shard_width] for i in range(self.shard_depth)]
+        return '/'.join(filter(None, [directory, *shards, digest + extension]))
+
+    def save(self, name, content, max_length=None):
+        """Store `content` under its hash, or add a reference to the identical file already stored"""
+        from .models import StoredFile
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        # Uploads hashed while streaming in (complaints/uploads.py) are not read again
+        digest = getattr(content, 'sha256', None)
+        if digest is not None:
+            size = content.size
+        else:
+            sha256 = hashlib.sha256()
+            size = 0
+            content.seek(0)
+            for chunk in content.chunks():
+                sha256.update(chunk)
+                size += len(chunk)
+            content.seek(0)
+            digest = sha256.hexdigest()
+        name = self.content_name(self.generate_filename(name), digest)
+
+        with transaction.atomic():
+            stored, created = StoredFile.objects.select_for_update().get_or_create(
+                name=name, defaults={'sha256': digest, 'size': size},
+            )
+            if not created:
+                StoredFile.objects.filter(pk=stored.pk).update(refcount=F('refcount') + 1)
+            # The name is the content hash, so a file already there (left by a crash, or by a
+            # deletion still pending on_commit) holds these bytes unless it was cut short
+            if self.exists(name) and self.size(name) != size:
+                FileSystemStorage.delete(self, name)
+            if not self.exists(name):
+                saved = super()._save(name, content)
+                if saved != name:
+                    # Another process wrote the same content in between; keep its copy
+                    FileSystemStorage.delete(self, saved)
+        return name
+
+    def delete(self, name):
+        """Drop one reference to `name`; the file goes once nothing references it"""
+        from .models import StoredFile
+
+        if not name:
+            return
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored is None:
+                super().delete(name)
+                return
+            if stored.refcount > 1:
+                StoredFile.objects.filter(pk=stored.pk).update(refcount=F('refcount') - 1)
+                return
+            stored.delete()
+            transaction.on_commit(lambda: self._delete_unreferenced(name))
+
+    def _delete_unreferenced(self, name):
+        from .models import StoredFile
+
+        # The same bytes may have been uploaded again since the last reference was dropped
+        if not StoredFile.objects.filter(name=name).exists():
+            FileSystemStorage.delete(self, name)
+
+
+_image_storage = None
+_originals_storage = None
+
+
+def image_storage():
+    """Storage for Complaint.image (a callable so migrations do not serialize its settings)"""
+    global _image_storage
+    if _image_storage is None:
+        _image_storage = ContentAddressedStorage()
+    return _image_storage
+
+
+def originals_storage():
+    """Cold storage for Complaint.original_image: INGEST_ORIGINALS_DIR, outside MEDIA_ROOT and never served"""
+    global _originals_storage
+    if _originals_storage is None:
+        from django.conf import settings
+
+        location = getattr(settings, 'INGEST_ORIGINALS_DIR', os.path.join(settings.BASE_DIR, 'originals'))
+        _originals_storage = ContentAddressedStorage(location=location)
+    return _originals_storage
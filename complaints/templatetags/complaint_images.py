@@ -0,0 +1,45 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from ..derivatives import is_current
+
+register = template.Library()
+
+PLACEHOLDER = 'img/complaint-placeholder.svg'
+
+
+def _srcset(names):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in sorted(names.items(), key=lambda item: int(item[0])))
+
+
+@register.simple_tag
+def complaint_image(complaint, sizes='100vw', css_class='', alt='Complaint image', fallback='placeholder'):
+    """
+    Responsive, lazily loaded <picture> for a complaint photo.
+
+    Serves the WebP derivatives with JPEG ones as fallback, and lets the browser
+    pick a width from `sizes`. While derivatives are still being generated it
+    shows the placeholder, or the original image when fallback='original'
+    (detail pages, where the full photo is wanted anyway).
+    """
+    image = getattr(complaint, 'image', None)
+    if not image:
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy" decoding="async">', static(PLACEHOLDER), css_class, alt)
+    if not is_current(complaint):
+        src = image.url if fallback == 'original' else static(PLACEHOLDER)
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy" decoding="async">', src, css_class, alt)
+
+    variants = complaint.image_variants
+    jpeg = variants.get('jpeg', {})
+    largest = max(jpeg, key=int)
+    height = round(variants['height'] * int(largest) / variants['width'])
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" class="{}" alt="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        _srcset(variants.get('webp', {})), sizes,
+        default_storage.url(jpeg[largest]), _srcset(jpeg), sizes, largest, height, css_class, alt,
+    )
@@ -1,3 +1,397 @@
-from django.test import TestCase
+import importlib.util
+import hashlib
+import io
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from complaints import mongo, tokens
+from complaints.batching import InferenceBatcher
+from complaints.models import AnalysisToken, Complaint, StoredFile, UploadSession
+from complaints.storage import image_storage
+from complaints.uploads import part_path
+
+
+def _use_temp_media(test, **overrides):
+    """Point MEDIA_ROOT (and the upload staging dir inside it) at a temporary directory for one test"""
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    settings_override = override_settings(
+        MEDIA_ROOT=media_root,
+        UPLOAD_STAGING_DIR=os.path.join(media_root, '.uploads'),
+        INGEST_NORMALIZE=False,
+        DERIVATIVES_ASYNC=False,
+        **overrides,
+    )
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+    return media_root
+
+
+def _jpeg(color='red'):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), color).save(buffer, 'JPEG')
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+@skipUnless(importlib.util.find_spec('mongomock'), 'mongomock is not installed')
+class GridFSMirrorTests(TestCase):
+    """complaints/mongo.py against mongomock; the writer thread is bypassed so each step runs in the test"""
+
+    def setUp(self):
+        _use_temp_media(self, MONGO_URI='mongomock://localhost/awaaz_test', MONGO_WRITE_RETRIES=2)
+        # A fresh client (and mongomock database) per test
+        mongo._client = None
+        self.addCleanup(setattr, mongo, '_client', None)
+        user = User.objects.create_user('alice', password='pw')
+        self.complaint = Complaint.objects.create(
+            user=user, title='Pothole', description='Deep', image=_jpeg(),
+            predicted_severity='moderate', confidence=0.8,
+        )
+
+    def _mirror(self):
+        """mirror_to_gridfs(), running the queued write inline instead of on the writer thread"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertTrue(mongo.mirror_to_gridfs(self.complaint))
+        self.assertEqual(Complaint.objects.get(pk=self.complaint.pk).mongo_status, 'pending')
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.complaint.refresh_from_db()
+
+    def test_mirror_stores_image(self):
+        with mock.patch.object(mongo, '_enqueue', mongo._write):
+            self._mirror()
+        self.assertEqual(self.complaint.mongo_status, 'stored')
+        self.assertEqual(self.complaint.mongo_error, '')
+        stored = mongo.get_gridfs().find_one({'metadata.complaint_id': self.complaint.pk})
+        self.assertEqual(str(stored._id), self.complaint.mongo_file_id)
+        with self.complaint.image.open('rb') as image:
+            self.assertEqual(stored.read(), image.read())
+
+    def test_write_reuses_existing_upload(self):
+        first = mongo.store_image(self.complaint, verify=True)
+        mongo._write(self.complaint.pk)
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.mongo_file_id, first)
+        self.assertEqual(len(list(mongo.get_gridfs().find({}))), 1)
+
+    def test_write_retries_then_records_failure(self):
+        with mock.patch.object(mongo, '_enqueue', mongo._write), \
+                mock.patch.object(mongo, 'store_image', side_effect=ConnectionError('mongod down')) as store, \
+                mock.patch.object(mongo.time, 'sleep') as sleep:
+            self._mirror()
+        self.assertEqual(store.call_count, 3)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.5, 1.0])
+        self.assertEqual(self.complaint.mongo_status, 'failed')
+        self.assertEqual(self.complaint.mongo_error, 'mongod down')
+        self.assertEqual(self.complaint.mongo_file_id, '')
+
+    def test_full_queue_records_failure(self):
+        full = queue.Queue(maxsize=1)
+        full.put_nowait(0)
+        with mock.patch.object(mongo, '_get_queue', return_value=full):
+            self._mirror()
+        self.assertEqual(self.complaint.mongo_status, 'failed')
+        self.assertEqual(self.complaint.mongo_error, 'GridFS write queue full')
+        self.assertEqual(full.qsize(), 1)
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Reference counting of complaint images in complaints/storage.py and complaints/signals.py"""
+
+    def setUp(self):
+        _use_temp_media(self)
+        self.user = User.objects.create_user('alice', password='pw')
+
+    def _complaint(self, image):
+        return Complaint.objects.create(
+            user=self.user, title='Pothole', description='Deep', image=image,
+            predicted_severity='moderate', confidence=0.8,
+        )
+
+    def _on_disk(self, name):
+        return os.path.exists(image_storage().path(name))
+
+    def test_same_bytes_are_stored_once(self):
+        first = self._complaint(_jpeg())
+        second = self._complaint(_jpeg())
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^complaints/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        stored = StoredFile.objects.get()
+        self.assertEqual((stored.name, stored.refcount), (first.image.name, 2))
+        self.assertEqual(os.listdir(os.path.dirname(image_storage().path(first.image.name))),
+                         [os.path.basename(first.image.name)])
+
+    def test_file_is_removed_with_the_last_reference(self):
+        first = self._complaint(_jpeg())
+        second = self._complaint(_jpeg())
+        name = first.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 1)
+        self.assertTrue(self._on_disk(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertFalse(self._on_disk(name))
+
+    def test_replacing_an_image_releases_the_old_one(self):
+        complaint = self._complaint(_jpeg('red'))
+        old_name = complaint.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.image = _jpeg('blue')
+            complaint.save()
+        self.assertNotEqual(complaint.image.name, old_name)
+        self.assertFalse(StoredFile.objects.filter(name=old_name).exists())
+        self.assertFalse(self._on_disk(old_name))
+        self.assertEqual(StoredFile.objects.get(name=complaint.image.name).refcount, 1)
+        self.assertTrue(self._on_disk(complaint.image.name))
+
+    def test_leftover_file_is_reused(self):
+        name = image_storage().save('complaints/photo.jpg', _jpeg())
+        # A crash (or a deletion still waiting for on_commit) left the file without its row
+        StoredFile.objects.all().delete()
+        self.assertEqual(image_storage().save('complaints/photo.jpg', _jpeg()), name)
+        self.assertEqual(StoredFile.objects.get().refcount, 1)
+        self.assertEqual(os.listdir(os.path.dirname(image_storage().path(name))), [os.path.basename(name)])
+
+    def test_truncated_leftover_file_is_rewritten(self):
+        name = image_storage().save('complaints/photo.jpg', _jpeg())
+        StoredFile.objects.all().delete()
+        with open(image_storage().path(name), 'r+b') as f:
+            f.truncate(10)
+        image_storage().save('complaints/photo.jpg', _jpeg())
+        with open(image_storage().path(name), 'rb') as f:
+            self.assertEqual(f.read(), _jpeg().read())
+
+
+@mock.patch('api.views.process_complaint_image', return_value={'draft': 'Draft', 'severity': 'moderate'})
+class ResumableUploadTests(TestCase):
+    """The chunked upload protocol of /api/upload_complaint/sessions/ (complaints/uploads.py)"""
+
+    def setUp(self):
+        _use_temp_media(self, UPLOAD_CHUNK_SIZE=1024)
+        User.objects.create_user('alice', password='pw')
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.effect_noise((64, 64), 64).convert('RGB').save(buffer, 'JPEG', quality=95)
+        self.data = buffer.getvalue()
+        self.assertGreater(len(self.data), 3 * 1024)
+
+    def _start(self, sha256=None):
+        response = self.client.post('/api/upload_complaint/sessions/', {
+            'username': 'alice', 'filename': 'photo.jpg', 'size': len(self.data),
+            'sha256': hashlib.sha256(self.data).hexdigest() if sha256 is None else sha256,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def _patch(self, session, offset, chunk):
+        return self.client.patch(session['upload_url'], chunk, content_type='application/octet-stream',
+                                 headers={'Upload-Offset': str(offset)})
+
+    def _send(self, session, start=0):
+        offset = start
+        while offset < len(self.data):
+            response = self._patch(session, offset, self.data[offset:offset + 1024])
+            self.assertEqual(response.status_code, 200)
+            offset = response.json()['offset']
+        return offset
+
+    def _complete(self, session):
+        return self.client.post('/api/upload_complaint/', {'username': 'alice', 'upload_session': session['upload_session']})
+
+    def test_chunks_assemble_into_a_complaint(self, _):
+        session = self._start()
+        self.assertEqual(self._send(session), len(self.data))
+        response = self._complete(session)
+        self.assertEqual(response.status_code, 200)
+        complaint = Complaint.objects.get(pk=response.json()['upload_id'])
+        self.assertTrue(complaint.image.name.endswith(hashlib.sha256(self.data).hexdigest() + '.jpg'))
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(settings.UPLOAD_STAGING_DIR, 'sessions')), [])
+
+    def test_offset_mismatch_reports_the_expected_offset(self, _):
+        session = self._start()
+        self._patch(session, 0, self.data[:1024])
+        response = self._patch(session, 0, self.data[:1024])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1024')
+        self.assertEqual(response.json()['offset'], 1024)
+        # The client resumes from the reported offset
+        self.assertEqual(self._send(session, start=1024), len(self.data))
+
+    def test_oversized_chunk_is_rejected(self, _):
+        session = self._start()
+        response = self._patch(session, 0, self.data[:2048])
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.client.get(session['upload_url']).json()['offset'], 0)
+
+    def test_chunk_past_the_declared_size_is_rejected(self, _):
+        session = self._start()
+        self._send(session)
+        response = self._patch(session, len(self.data), b'x')
+        self.assertEqual(response.status_code, 400)
+
+    def test_incomplete_session_cannot_be_posted(self, _):
+        session = self._start()
+        self._patch(session, 0, self.data[:1024])
+        response = self._complete(session)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 1024)
+        self.assertFalse(Complaint.objects.exists())
+
+    def test_checksum_mismatch_rewinds_the_session(self, _):
+        session = self._start(sha256=hashlib.sha256(b'other bytes').hexdigest())
+        self._send(session)
+        response = self._complete(session)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '0')
+        self.assertEqual(response.json()['offset'], 0)
+        self.assertFalse(Complaint.objects.exists())
+        self.assertEqual(self.client.get(session['upload_url']).json()['offset'], 0)
+        self.assertEqual(os.path.getsize(part_path(UploadSession.objects.get())), 0)
+        # The same session accepts the file again from the start
+        self.assertEqual(self._send(session), len(self.data))
+
+
+@mock.patch('complaints.tokens.analyze_image', return_value={
+    'severity': 'severe', 'confidence': 0.93, 'generated_text': 'Deep pothole', 'model_version': 'v1',
+})
+class AnalysisTokenTests(TestCase):
+    """Analyze once on /new/, then post by token without uploading again (complaints/tokens.py)"""
+
+    def setUp(self):
+        _use_temp_media(self)
+        self.user = User.objects.create_user('alice', password='pw')
+        self.client.force_login(self.user)
+
+    def _analyze(self):
+        response = self.client.post(reverse('upload'), {'action': 'analyze', 'image': _jpeg()})
+        data = response.json()
+        self.assertTrue(data['success'])
+        return data['analysis_token']
+
+    def _post(self, token, **fields):
+        return self.client.post(reverse('upload'), {'action': 'post', 'analysis_token': token, 'title': 'Pothole', **fields}).json()
+
+    def _expire_tokens(self):
+        AnalysisToken.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_post_takes_over_the_stored_image(self, _):
+        token = self._analyze()
+        name = AnalysisToken.objects.get().image.name
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 1)
+        # The prediction comes from the server, not from the client
+        self.assertTrue(self._post(token, predicted_severity='good', confidence='0.1')['success'])
+        complaint = Complaint.objects.get()
+        self.assertEqual(complaint.image.name, name)
+        self.assertEqual((complaint.predicted_severity, complaint.confidence, complaint.model_version), ('severe', 0.93, 'v1'))
+        self.assertFalse(AnalysisToken.objects.exists())
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 1)
+        self.assertTrue(os.path.exists(complaint.image.path))
+
+    def test_expired_token_is_refused(self, _):
+        token = self._analyze()
+        self._expire_tokens()
+        response = self._post(token)
+        self.assertFalse(response['success'])
+        self.assertTrue(response['token_expired'])
+        self.assertFalse(Complaint.objects.exists())
+
+    def test_token_cannot_be_used_twice(self, _):
+        token = self._analyze()
+        self.assertTrue(self._post(token)['success'])
+        self.assertTrue(self._post(token)['token_expired'])
+        self.assertEqual(Complaint.objects.count(), 1)
+
+    def test_sweep_releases_the_image(self, _):
+        self._analyze()
+        path = AnalysisToken.objects.get().image.path
+        self._expire_tokens()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(tokens.sweep_expired_tokens(), 1)
+        self.assertFalse(AnalysisToken.objects.exists())
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_deleting_the_user_releases_the_image(self, _):
+        self._analyze()
+        path = AnalysisToken.objects.get().image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+
+class InferenceBatcherTests(SimpleTestCase):
+    """complaints/batching.py with a fake run_batch; no model involved"""
+
+    def _batcher(self, run_batch, **kwargs):
+        batcher = InferenceBatcher(run_batch, **kwargs)
+        self.addCleanup(batcher.close)
+        return batcher
+
+    def _submit_together(self, batcher, items):
+        """Submit every item from its own thread at (nearly) the same moment"""
+        barrier = threading.Barrier(len(items))
+
+        def submit(item):
+            barrier.wait()
+            return batcher.submit(item, timeout=5)
+
+        with ThreadPoolExecutor(max_workers=len(items)) as pool:
+            return [pool.submit(submit, item) for item in items]
+
+    def test_concurrent_submits_are_grouped_up_to_max_batch_size(self):
+        batches = []
+
+        def run_batch(items):
+            batches.append(list(items))
+            return [item * 2 for item in items]
+
+        batcher = self._batcher(run_batch, max_batch_size=4, max_wait_ms=500)
+        futures = self._submit_together(batcher, list(range(8)))
+        self.assertEqual([future.result() for future in futures], [item * 2 for item in range(8)])
+        self.assertEqual(sorted(len(batch) for batch in batches), [4, 4])
+        self.assertEqual(sorted(item for batch in batches for item in batch), list(range(8)))
+
+    def test_partial_batch_is_flushed_after_max_wait(self):
+        batches = []
+
+        def run_batch(items):
+            batches.append(list(items))
+            return items
+
+        batcher = self._batcher(run_batch, max_batch_size=8, max_wait_ms=50)
+        start = time.monotonic()
+        self.assertEqual(batcher.submit('only', timeout=5), 'only')
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertEqual(batches, [['only']])
+
+    def test_run_batch_error_reaches_every_waiter(self):
+        def run_batch(items):
+            raise ValueError('forward failed')
+
+        batcher = self._batcher(run_batch, max_batch_size=4, max_wait_ms=200)
+        futures = self._submit_together(batcher, list(range(4)))
+        for future in futures:
+            with self.assertRaisesMessage(ValueError, 'forward failed'):
+                future.result()
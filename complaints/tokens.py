@@ -0,0 +1,105 @@
+"""
+Analysis tokens: analyze an image once, then post it without uploading it again.
+
+The analyze step normalizes the upload (complaints/ingest.py), runs the model,
+and keeps both the stored image and the prediction under a random token that
+expires after ANALYSIS_TOKEN_TTL seconds. The post step only sends the token.
+The complaint takes over the token's reference to the already stored image, so
+nothing is copied. The prediction comes from the server rather than from values
+echoed back by the client.
+
+Deleting a token in any way (sweep, user deletion, admin) releases its storage
+references through a post_delete signal. Expired tokens are swept as new ones
+are created, at most once a minute per process, and by the
+sweep_analysis_tokens management command for when analysis traffic stops.
+"""
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .ingest import normalize_image
+from .models import AnalysisToken
+from .services import analyze_image
+
+_SWEEP_INTERVAL = 60
+_last_sweep = 0.0
+
+
+def sweep_expired_tokens(limit=500):
+    """Delete expired tokens, releasing their stored images; returns how many were removed"""
+    removed = 0
+    expired = AnalysisToken.objects.filter(expires_at__lte=timezone.now()).order_by('expires_at')
+    for pk in expired.values_list('pk', flat=True)[:limit]:
+        # A token claimed meanwhile is already gone, so its image (now the complaint's) is not released
+        deleted, _ = AnalysisToken.objects.filter(pk=pk).delete()
+        removed += deleted
+    return removed
+
+
+def _maybe_sweep():
+    global _last_sweep
+    if time.monotonic() - _last_sweep > _SWEEP_INTERVAL:
+        _last_sweep = time.monotonic()
+        sweep_expired_tokens()
+
+
+def analyze_and_keep(user_id, upload):
+    """
+    Normalize and analyze an upload, keeping the result server-side.
+
+    Returns:
+        dict: analyze_image()'s result plus ``analysis_token`` and ``expires_at``
+    """
+    _maybe_sweep()
+    image = normalize_image(upload) if getattr(settings, 'INGEST_NORMALIZE', True) else upload
+    result = analyze_image(image)
+    token = AnalysisToken(
+        token=secrets.token_urlsafe(32),
+        user_id=user_id,
+        severity=result['severity'],
+        confidence=result['confidence'],
+        generated_text=result['generated_text'],
+        model_version=result['model_version'],
+        expires_at=timezone.now() + timedelta(seconds=getattr(settings, 'ANALYSIS_TOKEN_TTL', 1800)),
+    )
+    token.image.save(getattr(upload, 'name', '') or 'upload.jpg', image, save=False)
+    if image is not upload and getattr(settings, 'INGEST_KEEP_ORIGINALS', False):
+        token.original_image.save(upload.name, upload, save=False)
+    token.save()
+    return dict(result, analysis_token=token.token, expires_at=token.expires_at.isoformat())
+
+
+def post_with_token(complaint, token_value):
+    """
+    Save an unsaved complaint with the image and prediction kept under a token, consuming it.
+
+    Fields the user edits (title, description, generated text, ...) are left
+    as set on the complaint; an empty generated text falls back to the token's.
+
+    Returns:
+        bool: False if the token is unknown, expired or belongs to another user
+    """
+    with transaction.atomic():
+        token = AnalysisToken.objects.select_for_update().filter(
+            pk=token_value, user=complaint.user, expires_at__gt=timezone.now(),
+        ).first()
+        if token is None:
+            return False
+        # The complaint takes over the token's storage references: no copy, no re-upload
+        complaint.image = token.image.name
+        if token.original_image:
+            complaint.original_image = token.original_image.name
+        complaint.predicted_severity = token.severity
+        complaint.confidence = token.confidence
+        complaint.model_version = token.model_version
+        complaint.generated_text = complaint.generated_text or token.generated_text
+        # Detach the references first so the post_delete release leaves them to the complaint
+        token.image = ''
+        token.original_image = ''
+        token.delete()
+        complaint.save()
+    return True
@@ -0,0 +1,219 @@
+"""
+Streaming upload handling and resumable chunked uploads.
+
+HashingUploadHandler replaces Django's default upload handlers. Every uploaded
+file is hashed (SHA-256) and measured while its chunks stream in. Small
+requests stay in memory as before. Larger files are written chunk by chunk to
+a staging file under UPLOAD_STAGING_DIR, which lives in MEDIA_ROOT, so saving a
+complaint renames the file into content-addressed storage instead of copying
+it from /tmp. ContentAddressedStorage reuses the hash instead of reading the
+file again.
+
+Mobile clients on flaky networks can upload in resumable chunks instead:
+
+    POST  /api/upload_complaint/sessions/          {"username", "filename", "size", "sha256"?}
+    PATCH /api/upload_complaint/sessions/<id>/     Upload-Offset: <n>, body = next chunk
+    GET   /api/upload_complaint/sessions/<id>/     current offset, to resume after a failure
+    POST  /api/upload_complaint/                   {"username", "upload_session": <id>}
+
+Sessions untouched for UPLOAD_SESSION_TTL seconds are swept, together with their partial files.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+from django.utils import timezone
+
+_READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised when a chunk or a completed upload session is rejected."""
+
+
+class OffsetMismatch(UploadError):
+    """Raised when a chunk does not start where the session left off."""
+
+    def __init__(self, offset):
+        super().__init__(f'Expected a chunk at offset {offset}')
+        self.offset = offset
+
+
+def staging_dir(*parts):
+    directory = os.path.join(getattr(settings, 'UPLOAD_STAGING_DIR', os.path.join(settings.MEDIA_ROOT, '.uploads')), *parts)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+class StagedUploadedFile(TemporaryUploadedFile):
+    """A TemporaryUploadedFile created in UPLOAD_STAGING_DIR, on the same filesystem as media storage"""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        _, extension = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + extension, dir=staging_dir())
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Stream each uploaded file to memory or a staging file, hashing it on the way"""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.in_memory = content_length is not None and content_length <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        if self.in_memory:
+            self.file = io.BytesIO()
+        else:
+            self.file = StagedUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        if self.in_memory:
+            upload = InMemoryUploadedFile(
+                file=self.file,
+                field_name=self.field_name,
+                name=self.file_name,
+                content_type=self.content_type,
+                size=file_size,
+                charset=self.charset,
+                content_type_extra=self.content_type_extra,
+            )
+        else:
+            upload = self.file
+            upload.file.flush()
+            upload.size = file_size
+        upload.sha256 = self.sha256.hexdigest()
+        return upload
+
+    def upload_interrupted(self):
+        if not self.in_memory and hasattr(self, 'file'):
+            self.file.close()
+
+
+class AssembledUpload(File):
+    """A completed upload session's file, which storage can move into place like a temporary upload"""
+
+    def __init__(self, path, name, size, sha256):
+        super().__init__(open(path, 'rb'), name)
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def part_path(session):
+    return os.path.join(staging_dir('sessions'), f'{session.pk}.part')
+
+
+def sweep_expired_sessions():
+    """Delete sessions (and their partial files) untouched for UPLOAD_SESSION_TTL seconds"""
+    from .models import UploadSession
+
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'UPLOAD_SESSION_TTL', 86400))
+    expired = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in expired:
+        try:
+            os.remove(part_path(session))
+        except FileNotFoundError:
+            pass
+    UploadSession.objects.filter(pk__in=[session.pk for session in expired]).delete()
+    return len(expired)
+
+
+def create_session(user, filename, size, sha256='', content_type=''):
+    from .models import UploadSession
+
+    if size > getattr(settings, 'UPLOAD_MAX_SIZE', 30 * 1024 * 1024):
+        raise UploadError('File is too large')
+    sweep_expired_sessions()
+    session = UploadSession.objects.create(
+        user=user, filename=os.path.basename(filename), size=size, sha256=sha256.lower(), content_type=content_type,
+    )
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def append_chunk(session_id, offset, stream, length):
+    """
+    Write one chunk at `offset`, reading it from `stream` without buffering it whole.
+
+    A chunk cut short by a dropped connection still advances the offset by the
+    bytes received, so the client resumes from there.
+
+    Returns:
+        UploadSession: the session with its new offset
+    """
+    from .models import UploadSession
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id)
+        if offset != session.offset:
+            raise OffsetMismatch(session.offset)
+        if offset + length > session.size:
+            raise UploadError('Chunk runs past the declared size')
+        written = 0
+        with open(part_path(session), 'r+b') as f:
+            f.seek(offset)
+            while written < length:
+                data = stream.read(min(_READ_SIZE, length - written)) if stream is not None else b''
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+            # Drop anything past the recorded offset left by an earlier interrupted write
+            f.truncate()
+        session.offset = offset + written
+        session.save(update_fields=['offset', 'updated_at'])
+    return session
+
+
+@contextmanager
+def completed_upload(session):
+    """
+    Yield the assembled file of a finished session, checked against its declared size and hash.
+
+    The session and any staging file left behind (e.g. when storage already had
+    the same content) are removed afterwards. On a checksum mismatch the bytes
+    received are discarded and the session is rewound to offset 0 instead, so
+    the client can send the file again.
+    """
+    path = part_path(session)
+    if session.offset != session.size or not os.path.exists(path):
+        raise UploadError(f'Upload incomplete: {session.offset} of {session.size} bytes received')
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(_READ_SIZE), b''):
+            sha256.update(data)
+    digest = sha256.hexdigest()
+    if session.sha256 and session.sha256 != digest:
+        # Rewind the session so the client can resend the file from offset 0
+        open(path, 'wb').close()
+        session.offset = 0
+        session.save(update_fields=['offset', 'updated_at'])
+        raise UploadError('Checksum mismatch; the upload was reset, send it again from offset 0')
+    upload = AssembledUpload(path, session.filename, session.size, digest)
+    try:
+        yield upload
+    finally:
+        upload.close()
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        session.delete()
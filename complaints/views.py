@@ -1,5 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
@@ -10,31 +11,13 @@ import json
 from .forms import ComplaintForm, CommentForm, SeverityCorrectionForm, EditComplaintForm, ReportForm
 from .models import Complaint, Report, UserProfile, UserNotification, Comment, Announcement
 from .decorators import citizen_required
-from .services import predict_and_generate_text
+from .services import analyze_image, read_image_bytes
+from .metrics import stage_timer
+from .jobs import JobQueueFull, job_links, submit_analysis
+from .mongo import mirror_to_gridfs
+from .tokens import analyze_and_keep, post_with_token
 from django.utils import timezone
 
-# Optional: Mongo GridFS
-try:
-    from pymongo import MongoClient
-    from gridfs import GridFS
-    MONGO_AVAILABLE = True
-except Exception:
-    MONGO_AVAILABLE = False
-
-
-def _save_to_mongo(path: str) -> str:
-    if not MONGO_AVAILABLE:
-        return ''
-    uri = getattr(settings, 'MONGO_URI', '')
-    if not uri:
-        return ''
-    client = MongoClient(uri)
-    db = client.get_database()
-    fs = GridFS(db)
-    with open(path, 'rb') as f:
-        file_id = fs.put(f, filename=path.split('/')[-1])
-    return str(file_id)
-
 
 def feed_view(request):
     qs = Complaint.objects.filter(public=True)
@@ -80,6 +63,15 @@ def _check_user_banned(user):
     return profile.is_currently_banned()
 
 
+def _upload_context(request):
+    return {
+        'form': ComplaintForm(),
+        'async_analyze': settings.INFERENCE_ASYNC_WEB,
+        # Server-sent events only stream under ASGI; over WSGI the page polls the job instead
+        'stream_events': isinstance(request, ASGIRequest),
+    }
+
+
 @login_required
 @citizen_required
 def upload_view(request):
@@ -105,28 +97,21 @@ def upload_view(request):
             if not uploaded:
                 return JsonResponse({'success': False, 'error': 'Please choose an image to upload.'})
             
+            if str(request.POST.get('async', '')).lower() in ('true', 'on', '1', 'yes'):
+                try:
+                    job_id = submit_analysis(request.user, read_image_bytes(uploaded), keep_name=uploaded.name)
+                except JobQueueFull as e:
+                    return JsonResponse({'success': False, 'error': str(e)})
+                return JsonResponse({'success': True, **job_links(job_id)})
+            
             try:
-                # Save file temporarily without creating database record
-                import os
-                import tempfile
-                from django.core.files.storage import default_storage
-                
-                # Create a temporary file path
-                temp_path = default_storage.save(f'temp/{uploaded.name}', uploaded)
-                full_path = default_storage.path(temp_path)
-                
-                # Get prediction
-                pred, conf, text = predict_and_generate_text(full_path)
-                
-                # Clean up temporary file
-                default_storage.delete(temp_path)
+                # Keep the processed image and prediction under a token so posting does not re-upload it
+                result = analyze_and_keep(request.user.pk, uploaded)
                 
                 # Return analysis results
                 return JsonResponse({
                     'success': True,
-                    'severity': pred,
-                    'confidence': conf,
-                    'generated_text': text,
+                    **result,
                     'image_url': None  # No image URL for analysis
                 })
             except Exception as e:
@@ -134,45 +119,60 @@ def upload_view(request):
         
         # Handle posting to feed
         elif action == 'post':
+            token = request.POST.get('analysis_token', '')
             uploaded = request.FILES.get('image')
-            if not uploaded:
+            if not token and not uploaded:
                 return JsonResponse({'success': False, 'error': 'Please choose an image to upload.'})
             
             public_raw = str(request.POST.get('public', '')).lower()
             public_flag = public_raw in ('true', 'on', '1', 'yes')
             complaint = Complaint(user=request.user, public=public_flag)
-            complaint.image = uploaded
             complaint.title = request.POST.get('title', '')
             complaint.description = request.POST.get('description', '')
             complaint.location = request.POST.get('location', '')
-            complaint.predicted_severity = request.POST.get('predicted_severity', 'moderate')
-            complaint.confidence = float(request.POST.get('confidence', 0.5))
             complaint.generated_text = request.POST.get('generated_text', '')
-            complaint.save()
-            complaint.mongo_file_id = _save_to_mongo(complaint.image.path)
-            complaint.save()
+            if token:
+                # Image and prediction were kept server-side by the analyze step
+                with stage_timer('file_save'):
+                    posted = post_with_token(complaint, token)
+                if not posted:
+                    return JsonResponse({
+                        'success': False,
+                        'token_expired': True,
+                        'error': 'Your analysis has expired. Please post again.',
+                    })
+            else:
+                complaint.image = uploaded
+                complaint.predicted_severity = request.POST.get('predicted_severity', 'moderate')
+                complaint.confidence = float(request.POST.get('confidence', 0.5))
+                complaint.model_version = request.POST.get('model_version', '')[:100]
+                with stage_timer('file_save'):
+                    complaint.save()
+            mirror_to_gridfs(complaint)
             return JsonResponse({'success': True, 'redirect_url': reverse('feed')})
         
         # Handle regular form submission (fallback)
         else:
             uploaded = request.FILES.get('image')
             if not uploaded:
-                return render(request, 'complaints/upload.html', {'form': ComplaintForm()})
+                return render(request, 'complaints/upload.html', _upload_context(request))
             public_raw = str(request.POST.get('public', '')).lower()
             public_flag = public_raw in ('true', 'on', '1', 'yes')
             complaint = Complaint(user=request.user, public=public_flag)
             complaint.image = uploaded
-            complaint.save()  # saves file to disk
-            pred, conf, text = predict_and_generate_text(complaint.image.path)
-            complaint.predicted_severity = pred
-            complaint.confidence = conf
-            complaint.generated_text = text
-            complaint.mongo_file_id = _save_to_mongo(complaint.image.path)
+            with stage_timer('file_save'):
+                complaint.save()  # saves file to disk
+            result = analyze_image(complaint.image.path)
+            complaint.predicted_severity = result['severity']
+            complaint.confidence = result['confidence']
+            complaint.generated_text = result['generated_text']
+            complaint.model_version = result['model_version']
             complaint.save()
+            mirror_to_gridfs(complaint)
             return redirect('complaint_detail', pk=complaint.pk)
     
     # GET
-    return render(request, 'complaints/upload.html', {'form': ComplaintForm()})
+    return render(request, 'complaints/upload.html', _upload_context(request))
 
 
 def detail_view(request, pk: int):
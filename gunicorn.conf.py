@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration: gunicorn awaaz_web.wsgi -c gunicorn.conf.py
+
+The application, and with it the model, is loaded once in the master before
+workers are forked, so every worker maps the same weight pages instead of
+holding a private copy. Check the sharing under load with
+`python manage.py memory_report --gunicorn <master pid>`.
+"""
+import os
+
+os.environ.setdefault('AWAAZ_INFERENCE_PRELOAD', '1')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '4'))
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Warm-up runs forward passes, which start PyTorch's thread pools; those
+    # must be created in the worker, not inherited from the master.
+    from django.conf import settings
+
+    if getattr(settings, 'INFERENCE_WARMUP', False):
+        from complaints import services
+        services.start_warm_up()
@@ -0,0 +1,40 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.benchmark import synthetic_jpeg, time_call
+from src.utils.preprocessing import IMAGE_SIZE, open_image, preprocess
+
+RESOLUTIONS = [(1280, 720), (1920, 1080), (4032, 3024)]
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare full vs draft-mode JPEG decoding")
+	parser.add_argument("images", nargs="*", help="JPEG files to use instead of synthetic images")
+	parser.add_argument("--iterations", type=int, default=20)
+	args = parser.parse_args()
+
+	if args.images:
+		samples = []
+		for path in args.images:
+			with open(path, "rb") as f:
+				samples.append((os.path.basename(path), f.read()))
+	else:
+		samples = [(f"synthetic {w}x{h}", synthetic_jpeg(w, h)) for w, h in RESOLUTIONS]
+
+	print(f"{'image':<24} {'mode':<6} {'decoded':>11} {'decode MB':>9} {'p50 ms':>8} {'end-to-end p50 ms':>18}")
+	for name, data in samples:
+		for draft in (False, True):
+			decoded = open_image(data, IMAGE_SIZE, draft=draft)
+			decode = time_call(lambda: open_image(data, IMAGE_SIZE, draft=draft), args.iterations)
+			total = time_call(lambda: preprocess(data, IMAGE_SIZE, draft=draft), args.iterations)
+			size = f"{decoded.width}x{decoded.height}"
+			megabytes = decoded.width * decoded.height * 3 / 1e6
+			mode = "draft" if draft else "full"
+			print(f"{name:<24} {mode:<6} {size:>11} {megabytes:>9.1f} {decode['p50_ms']:>8.1f} {total['p50_ms']:>18.1f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,175 @@
+"""
+Reproducible inference benchmark on synthetic inputs.
+
+Builds the model with random weights (no checkpoint or network access) and
+synthetic road-like JPEGs, then times every serving stage across resolutions,
+preprocessing variants, torch thread counts and batch sizes. Results are
+written as JSON so runs on different commits can be compared:
+
+	python scripts/benchmark_inference.py --out bench/before.json
+	python scripts/benchmark_inference.py --out bench/after.json --compare bench/before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import torch
+import torch.nn.functional as F
+
+from src.models.model import ARCHITECTURES, build_model
+from src.utils.benchmark import summarize, synthetic_jpeg
+from src.utils.preprocessing import IMAGE_SIZE, get_transform, open_image
+
+STAGES = ["decode", "resize", "forward", "softmax", "end_to_end"]
+
+
+def parse_resolution(value):
+	width, _, height = value.lower().partition("x")
+	return int(width), int(height)
+
+
+def git_commit():
+	try:
+		return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return ""
+
+
+def run_config(model, images, batch_size, draft, iterations, warmup):
+	"""Time one (resolution, preprocessing, threads, batch size) configuration."""
+	transform = get_transform(IMAGE_SIZE)
+	stages = {stage: [] for stage in STAGES}
+	for i in range(warmup + iterations):
+		batch_images = [images[(i * batch_size + j) % len(images)] for j in range(batch_size)]
+		timings = dict.fromkeys(STAGES, 0.0)
+		start = time.perf_counter()
+		tensors = []
+		for data in batch_images:
+			t0 = time.perf_counter()
+			decoded = open_image(data, IMAGE_SIZE, draft=draft)
+			t1 = time.perf_counter()
+			tensors.append(transform(decoded))
+			t2 = time.perf_counter()
+			timings["decode"] += t1 - t0
+			timings["resize"] += t2 - t1
+		batch = torch.stack(tensors)
+		with torch.no_grad():
+			t0 = time.perf_counter()
+			outputs = model(batch)
+			t1 = time.perf_counter()
+			# Same post-processing as complaints.services._forward
+			confidences, predicted = torch.max(F.softmax(outputs, dim=1), 1)
+			list(zip(predicted.tolist(), confidences.tolist()))
+			t2 = time.perf_counter()
+		timings["forward"] = t1 - t0
+		timings["softmax"] = t2 - t1
+		timings["end_to_end"] = t2 - start
+		if i >= warmup:
+			for stage, seconds in timings.items():
+				stages[stage].append(seconds * 1000)
+	end_to_end = summarize(stages["end_to_end"])
+	return {
+		"stages": {stage: summarize(values) for stage, values in stages.items()},
+		"images_per_s": batch_size * 1000 / end_to_end["mean_ms"],
+	}
+
+
+def config_key(result):
+	return (result["resolution"], result["preprocess"], result["threads"], result["batch_size"])
+
+
+def compare(results, baseline_path):
+	"""Print the end-to-end p50 and throughput change of every configuration present in both runs."""
+	with open(baseline_path) as f:
+		baseline = {config_key(r): r for r in json.load(f)["results"]}
+	print(f"\nvs {baseline_path}", file=sys.stderr)
+	print(f"{'resolution':>11} {'prep':<6} {'thr':>3} {'batch':>5} {'p50 ms':>16} {'img/s':>16}", file=sys.stderr)
+	for result in results:
+		old = baseline.get(config_key(result))
+		if old is None:
+			continue
+		new_p50 = result["stages"]["end_to_end"]["p50_ms"]
+		old_p50 = old["stages"]["end_to_end"]["p50_ms"]
+		p50_change = 100 * (new_p50 - old_p50) / old_p50
+		ips_change = 100 * (result["images_per_s"] - old["images_per_s"]) / old["images_per_s"]
+		print(
+			f"{result['resolution']:>11} {result['preprocess']:<6} {result['threads']:>3} {result['batch_size']:>5} "
+			f"{new_p50:>8.1f} ({p50_change:+5.1f}%) {result['images_per_s']:>7.1f} ({ips_change:+5.1f}%)",
+			file=sys.stderr,
+		)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark inference stages on synthetic images with a random-weight model")
+	parser.add_argument("--arch", choices=sorted(ARCHITECTURES), default="resnet18")
+	parser.add_argument("--resolutions", nargs="+", default=["640x480", "1280x720", "1920x1080", "4032x3024"])
+	parser.add_argument("--preprocess", nargs="+", choices=["full", "draft"], default=["full", "draft"], help="JPEG decoding variants")
+	parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+	parser.add_argument("--threads", type=int, nargs="+", default=[torch.get_num_threads()], help="torch intra-op thread counts")
+	parser.add_argument("--images", type=int, default=4, help="Distinct synthetic images per resolution")
+	parser.add_argument("--iterations", type=int, default=10)
+	parser.add_argument("--warmup", type=int, default=2)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--out", default="-", help="JSON results file (default: stdout)")
+	parser.add_argument("--compare", default="", help="Earlier results file to compare against")
+	args = parser.parse_args()
+
+	torch.manual_seed(args.seed)
+	model = build_model(args.arch, num_classes=4, pretrained=False)
+	model.eval()
+
+	results = []
+	for resolution in args.resolutions:
+		width, height = parse_resolution(resolution)
+		images = [synthetic_jpeg(width, height, seed=args.seed + i) for i in range(args.images)]
+		for preprocess in args.preprocess:
+			for threads in args.threads:
+				torch.set_num_threads(threads)
+				for batch_size in args.batch_sizes:
+					result = run_config(model, images, batch_size, preprocess == "draft", args.iterations, args.warmup)
+					result.update(resolution=resolution, preprocess=preprocess, threads=threads, batch_size=batch_size)
+					results.append(result)
+					stages = result["stages"]
+					print(
+						f"{resolution:>11} {preprocess:<6} threads={threads:<2} batch={batch_size:<3} "
+						f"decode {stages['decode']['p50_ms']:7.1f} resize {stages['resize']['p50_ms']:6.1f} "
+						f"forward {stages['forward']['p50_ms']:7.1f} softmax {stages['softmax']['p50_ms']:5.2f} "
+						f"end-to-end {stages['end_to_end']['p50_ms']:7.1f} ms  {result['images_per_s']:7.1f} img/s",
+						file=sys.stderr,
+					)
+
+	report = {
+		"meta": {
+			"commit": git_commit(),
+			"created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+			"arch": args.arch,
+			"seed": args.seed,
+			"iterations": args.iterations,
+			"warmup": args.warmup,
+			"torch": torch.__version__,
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"cpu_count": os.cpu_count(),
+		},
+		"results": results,
+	}
+	if args.out == "-":
+		json.dump(report, sys.stdout, indent=2)
+		sys.stdout.write("\n")
+	else:
+		os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+		with open(args.out, "w") as f:
+			json.dump(report, f, indent=2)
+	if args.compare:
+		compare(results, args.compare)
+
+
+if __name__ == "__main__":
+	main()
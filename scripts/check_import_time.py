@@ -0,0 +1,75 @@
+"""
+Guard against the ML stack creeping back into Django's import path.
+
+Runs a management command (``check`` by default) under ``python -X importtime``.
+Fails if torch, torchvision or the other heavy inference dependencies are
+imported, or if total import time exceeds the budget:
+
+	python scripts/check_import_time.py
+	python scripts/check_import_time.py --max-ms 1500 --top 15 -- migrate --plan
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only inference needs these; complaints.services imports them on first use
+FORBIDDEN = ["torch", "torchvision", "numpy", "onnxruntime", "sklearn", "matplotlib"]
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def parse_importtime(stderr):
+	"""Return [(module, cumulative_us, depth)] from -X importtime output."""
+	entries = []
+	for line in stderr.splitlines():
+		match = LINE.match(line)
+		if match:
+			_, cumulative, indent, module = match.groups()
+			entries.append((module, int(cumulative), (len(indent) - 1) // 2))
+	return entries
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Fail if Django startup imports the ML stack or exceeds an import-time budget")
+	parser.add_argument("--max-ms", type=float, default=1000.0, help="Budget for total import time")
+	parser.add_argument("--top", type=int, default=10, help="Show the slowest top-level imports")
+	parser.add_argument("command", nargs="*", default=["check"], help="manage.py command to run (default: check)")
+	args = parser.parse_args()
+
+	result = subprocess.run(
+		[sys.executable, "-X", "importtime", "manage.py"] + args.command,
+		cwd=REPO_ROOT,
+		capture_output=True,
+		text=True,
+	)
+	if result.returncode != 0:
+		print(result.stderr[-2000:], file=sys.stderr)
+		print(f"manage.py {' '.join(args.command)} failed", file=sys.stderr)
+		sys.exit(result.returncode)
+
+	entries = parse_importtime(result.stderr)
+	top_level = [(module, us) for module, us, depth in entries if depth == 0]
+	total_ms = sum(us for _, us in top_level) / 1000
+	imported = {module for module, _, _ in entries}
+	forbidden = [name for name in FORBIDDEN if name in imported]
+
+	print(f"manage.py {' '.join(args.command)}: {len(imported)} modules, {total_ms:.0f} ms of imports (budget {args.max_ms:.0f} ms)")
+	for module, us in sorted(top_level, key=lambda item: -item[1])[:args.top]:
+		print(f"  {us / 1000:8.1f} ms  {module}")
+
+	failed = False
+	if forbidden:
+		print(f"FAIL: imported {', '.join(forbidden)}; load them lazily on first inference", file=sys.stderr)
+		failed = True
+	if total_ms > args.max_ms:
+		print(f"FAIL: import time {total_ms:.0f} ms exceeds {args.max_ms:.0f} ms", file=sys.stderr)
+		failed = True
+	sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+	main()
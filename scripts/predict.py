@@ -1,27 +1,99 @@
 import argparse
+import csv
+import glob
+import json
 import os
 import sys
-import subprocess
+import time
 
-DEFAULT_CKPT = "checkpoints/best.pt"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app.predict import PotholePredictor
+from src.models.registry import DEFAULT_ROOT, resolve_model
+from src.utils.prediction_cache import PredictionCache
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+FIELDS = ["image_path", "prediction", "confidence", "is_valid"]
+
+
+def collect_images(inputs):
+	"""Expand files, directories (recursively) and glob patterns into a sorted list of image paths."""
+	paths = []
+	for item in inputs:
+		if os.path.isdir(item):
+			for root, _, files in os.walk(item):
+				paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+		elif os.path.isfile(item):
+			paths.append(item)
+		else:
+			paths.extend(p for p in glob.glob(item, recursive=True) if p.lower().endswith(IMAGE_EXTENSIONS))
+	return sorted(set(paths))
+
+
+def open_writer(path):
+	"""Return (write_row, close) for a .csv or .jsonl output file, or stdout JSONL when path is '-'."""
+	f = sys.stdout if path == "-" else open(path, "w", newline="")
+	if path.endswith(".csv"):
+		writer = csv.DictWriter(f, fieldnames=FIELDS)
+		writer.writeheader()
+		write_row = writer.writerow
+	else:
+		def write_row(row):
+			f.write(json.dumps(row) + "\n")
+	close = (lambda: None) if f is sys.stdout else f.close
+	return write_row, close
 
 
 def main():
-	parser = argparse.ArgumentParser(description="Simple predictor")
-	parser.add_argument("image", help="Path to image")
-	parser.add_argument("--ckpt", default=DEFAULT_CKPT)
+	parser = argparse.ArgumentParser(description="Score images, directories or globs with the severity model")
+	parser.add_argument("inputs", nargs="+", help="Image files, directories or glob patterns")
+	parser.add_argument("--ckpt", default=None, help="Model artifact (default: active registry version, else checkpoints/best.pt)")
+	parser.add_argument("--backend", default="eager", choices=["eager", "torchscript", "onnx"])
+	parser.add_argument("--registry", default=DEFAULT_ROOT, help="Model registry directory")
+	parser.add_argument("--out", default="-", help="Output .jsonl or .csv file (default: JSONL on stdout)")
+	parser.add_argument("--batch-size", type=int, default=32)
+	parser.add_argument("--workers", type=int, default=4, help="Decode threads")
+	parser.add_argument("--threshold", type=float, default=0.5, help="Confidence threshold")
+	parser.add_argument("--cache", default="", help="SQLite file for a persistent prediction cache")
 	args = parser.parse_args()
 
+	if args.ckpt is None:
+		args.ckpt, args.backend, _ = resolve_model(args.registry, default_backend=args.backend)
 	if not os.path.isfile(args.ckpt):
-		print(f"Checkpoint not found: {args.ckpt}")
+		print(f"Checkpoint not found: {args.ckpt}", file=sys.stderr)
+		sys.exit(1)
+	images = collect_images(args.inputs)
+	if not images:
+		print("No images found", file=sys.stderr)
 		sys.exit(1)
-	if not os.path.isfile(args.image):
-		print(f"Image not found: {args.image}")
+
+	cache = PredictionCache(sqlite_path=args.cache) if args.cache else None
+	predictor = PotholePredictor(args.ckpt, cache=cache, backend=args.backend)
+	if predictor.model is None:
 		sys.exit(1)
+	predictor.confidence_threshold = args.threshold
+
+	write_row, close = open_writer(args.out)
+	start = time.perf_counter()
+	invalid = 0
+	try:
+		for i, row in enumerate(predictor.iter_predict_batch(images, batch_size=args.batch_size, num_workers=args.workers), 1):
+			invalid += not row["is_valid"]
+			write_row(row)
+			if i % 500 == 0:
+				elapsed = time.perf_counter() - start
+				print(f"Scored {i}/{len(images)} ({i / elapsed:.1f} img/s)", file=sys.stderr)
+	finally:
+		close()
 
-	cmd = [sys.executable, "src/app/predict.py", "--checkpoint", args.ckpt, "--image", args.image]
-	proc = subprocess.run(cmd)
-	sys.exit(proc.returncode)
+	elapsed = time.perf_counter() - start
+	print(
+		f"Scored {len(images)} images in {elapsed:.2f}s ({len(images) / elapsed:.1f} img/s, "
+		f"{1000 * elapsed / len(images):.1f} ms/img), {invalid} invalid",
+		file=sys.stderr,
+	)
+	if cache is not None:
+		print(f"Cache: {cache.stats()}", file=sys.stderr)
 
 
 if __name__ == "__main__":
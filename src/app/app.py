@@ -1,11 +1,11 @@
 import streamlit as st
 import torch
-import cv2
 import numpy as np
 import uuid
 from datetime import datetime
 from src.models.model import PotholeSeverityModel
-from src.data.dataset import CLASS_NAMES, _resize_and_pad, _to_tensor
+from src.data.dataset import CLASS_NAMES
+from src.utils.preprocessing import IMAGE_SIZE, get_transform, open_image
 from .admin import report_complaint, show_admin_panel
 from .db import db
 from .models import ReportType, User, UserStatus
@@ -56,16 +56,16 @@ if page == "Home":
         # Generate a unique ID for this complaint
         complaint_id = f"comp_{int(datetime.now().timestamp())}"
         
-        file_bytes = np.asarray(bytearray(uploaded.read()), dtype=np.uint8)
-        bgr = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-        if bgr is None:
+        try:
+            rgb = open_image(uploaded.read(), IMAGE_SIZE)
+        except Exception:
+            rgb = None
+        if rgb is None:
             st.error("Invalid image")
         else:
-            rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
             st.image(rgb, caption="Uploaded", use_container_width=True)
             model, device = load_model(checkpoint_path)
-            proc = _resize_and_pad(rgb, 224)
-            tensor = _to_tensor(proc).unsqueeze(0).to(device)
+            tensor = get_transform(IMAGE_SIZE)(rgb).unsqueeze(0).to(device)
             with torch.no_grad():
                 logits = model(tensor)
                 probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
@@ -5,7 +5,7 @@ from torch.utils.data import DataLoader
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
 
 from src.data.dataset import PotholeImageDataset, CLASS_NAMES
-from src.models.model import PotholeSeverityModel
+from src.models.backends import load_eager
 
 
 def main():
@@ -18,11 +18,8 @@ def main():
 	ds = PotholeImageDataset(args.data_dir, split="test", image_size=224, augment=False)
 	loader = DataLoader(ds, batch_size=32, shuffle=False, num_workers=2)
 
-	model = PotholeSeverityModel.create(num_classes=len(CLASS_NAMES), pretrained=False)
-	ckpt = torch.load(args.checkpoint, map_location=device)
-	model.load_state_dict(ckpt["model_state"]) 
-	model.to(device)
-	model.eval()
+	# Builds whichever architecture the checkpoint was trained with (resnet18 or screen)
+	model = load_eager(args.checkpoint, device, num_classes=len(CLASS_NAMES))
 
 	all_preds, all_labels = [], []
 	with torch.no_grad():
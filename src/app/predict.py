@@ -1,12 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import torch
 import torch.nn.functional as F
-from PIL import Image
-import torchvision.transforms as transforms
 import numpy as np
-from src.models.model import PotholeSeverityModel
+from src.models.backends import load_inference_model
+from src.models.registry import DEFAULT_ROOT, resolve_model
+from src.utils.prediction_cache import PredictionCache, checkpoint_version, image_key
+from src.utils.preprocessing import IMAGE_SIZE, get_transform, open_image
 
 class PotholePredictor:
-    def __init__(self, checkpoint_path='checkpoints/best.pt'):
+    def __init__(self, checkpoint_path=None, cache=None, backend='eager', registry_dir=DEFAULT_ROOT):
+        # Without an explicit path, serve the registry's active version (or checkpoints/best.pt)
+        if checkpoint_path is None:
+            checkpoint_path, backend, _ = resolve_model(registry_dir, default_backend=backend)
+        self.backend = backend
         self.device = torch.device('mps' if torch.backends.mps.is_available() else 'cuda' if torch.cuda.is_available() else 'cpu')
         self.class_names = ['none', 'minor', 'moderate', 'severe']
         self.confidence_threshold = 0.5  # Minimum confidence to make a prediction
@@ -14,26 +21,58 @@ class PotholePredictor:
         # Load model
         self.model = self._load_model(checkpoint_path)
         
-        # Define transforms
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
+        # Optional PredictionCache; repeated images skip decoding and the forward pass
+        self.cache = cache
+        self.model_version = checkpoint_version(checkpoint_path) if self.model is not None else ''
+        
+        # Shared (cached) transform from the common preprocessing module
+        self.transform = get_transform(IMAGE_SIZE)
     
     def _load_model(self, checkpoint_path):
-        """Load the trained model from checkpoint"""
+        """Load the trained model from a checkpoint or compiled artifact"""
         try:
-            checkpoint = torch.load(checkpoint_path, map_location=self.device)
-            model = PotholeSeverityModel(num_classes=4, pretrained=False)
-            model.load_state_dict(checkpoint['model_state_dict'])
-            model.to(self.device)
-            model.eval()
-            return model
+            return load_inference_model(checkpoint_path, backend=self.backend, device=self.device)
         except Exception as e:
             print(f"Error loading model: {e}")
             return None
     
+    def _load(self, image_path):
+        """
+        Read and preprocess one image (runs on the decode worker threads)
+        
+        Returns:
+            tuple: (cached, image_tensor, cache_key)
+            - cached: (label, confidence) on a cache hit, otherwise None
+            - image_tensor: preprocessed (3, H, W) tensor, None on a cache hit
+        """
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        key = image_key(data, self.model_version) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return tuple(cached), None, key
+        return None, self.transform(open_image(data, IMAGE_SIZE)), key
+    
+    def _classify(self, tensors):
+        """One forward pass over a list of preprocessed images; returns [(label, confidence)]"""
+        with torch.no_grad():
+            outputs = self.model(torch.stack(tensors).to(self.device))
+            probabilities = F.softmax(outputs, dim=1)
+            confidences, predicted = torch.max(probabilities, 1)
+        return [(self.class_names[i], c) for i, c in zip(predicted.tolist(), confidences.tolist())]
+    
+    def _finalize(self, predicted_label, confidence):
+        # Apply confidence threshold
+        if confidence < self.confidence_threshold:
+            return 'none', confidence, True
+        
+        # Special handling for 'none' class (good road)
+        if predicted_label == 'none':
+            return 'none', confidence, True
+        
+        return predicted_label, confidence, True
+    
     def predict(self, image_path):
         """
         Predict pothole severity from image
@@ -48,58 +87,91 @@ class PotholePredictor:
             return 'invalid', 0.0, False
         
         try:
-            # Load and preprocess image
-            image = Image.open(image_path).convert('RGB')
-            image_tensor = self.transform(image).unsqueeze(0).to(self.device)
-            
-            # Get prediction
-            with torch.no_grad():
-                outputs = self.model(image_tensor)
-                probabilities = F.softmax(outputs, dim=1)
-                confidence, predicted = torch.max(probabilities, 1)
-                
-                confidence = confidence.item()
-                predicted_class = predicted.item()
-                predicted_label = self.class_names[predicted_class]
-            
-            # Apply confidence threshold
-            if confidence < self.confidence_threshold:
-                return 'none', confidence, True
-            
-            # Special handling for 'none' class (good road)
-            if predicted_label == 'none':
-                return 'none', confidence, True
-            
-            return predicted_label, confidence, True
+            cached, image_tensor, key = self._load(image_path)
+            if cached is None:
+                cached = self._classify([image_tensor])[0]
+                if key is not None:
+                    self.cache.set(key, list(cached))
+            return self._finalize(*cached)
             
         except Exception as e:
             print(f"Error processing image {image_path}: {e}")
             return 'invalid', 0.0, False
     
-    def predict_batch(self, image_paths):
-        """Predict for multiple images"""
-        results = []
-        for image_path in image_paths:
-            prediction, confidence, is_valid = self.predict(image_path)
-            results.append({
+    def _predict_chunk(self, chunk):
+        """Classify one batch of (image_path, decode_future) pairs with a single forward pass"""
+        outcomes = [None] * len(chunk)
+        pending = []
+        for i, (image_path, future) in enumerate(chunk):
+            try:
+                cached, image_tensor, key = future.result()
+            except Exception as e:
+                print(f"Error processing image {image_path}: {e}")
+                outcomes[i] = ('invalid', 0.0, False)
+                continue
+            if cached is not None:
+                outcomes[i] = self._finalize(*cached)
+            else:
+                pending.append((i, image_tensor, key))
+        
+        if pending:
+            for (i, _, key), result in zip(pending, self._classify([t for _, t, _ in pending])):
+                if key is not None:
+                    self.cache.set(key, list(result))
+                outcomes[i] = self._finalize(*result)
+        
+        for (image_path, _), (prediction, confidence, is_valid) in zip(chunk, outcomes):
+            yield {
                 'image_path': image_path,
                 'prediction': prediction,
                 'confidence': confidence,
                 'is_valid': is_valid
-            })
-        return results
+            }
+    
+    def iter_predict_batch(self, image_paths, batch_size=32, num_workers=4):
+        """
+        Predict for many images, yielding one result dict per image in input order
+        
+        Images are decoded on a thread pool (PIL releases the GIL while decoding)
+        and classified batch_size at a time. The next batch is decoded while the
+        current one runs through the model, and at most two batches are held in
+        memory, so this streams over arbitrarily long inputs.
+        """
+        if self.model is None:
+            for image_path in image_paths:
+                yield {'image_path': image_path, 'prediction': 'invalid', 'confidence': 0.0, 'is_valid': False}
+            return
+        
+        paths = iter(image_paths)
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            def submit_next():
+                return [(p, pool.submit(self._load, p)) for p in islice(paths, batch_size)]
+            
+            chunk = submit_next()
+            while chunk:
+                upcoming = submit_next()
+                yield from self._predict_chunk(chunk)
+                chunk = upcoming
+    
+    def predict_batch(self, image_paths, batch_size=32, num_workers=4):
+        """Predict for multiple images"""
+        return list(self.iter_predict_batch(image_paths, batch_size=batch_size, num_workers=num_workers))
 
 def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Predict pothole severity from image')
     parser.add_argument('image_path', help='Path to image file')
-    parser.add_argument('--checkpoint', default='checkpoints/best.pt', help='Path to model checkpoint')
+    parser.add_argument('--checkpoint', default=None, help='Path to model checkpoint (default: active registry version, else checkpoints/best.pt)')
     parser.add_argument('--threshold', type=float, default=0.5, help='Confidence threshold')
+    parser.add_argument('--backend', default='eager', choices=['eager', 'torchscript', 'onnx'], help='Model format of --checkpoint')
+    parser.add_argument('--cache', default='', help='SQLite file for a persistent prediction cache')
+    parser.add_argument('--registry', default=DEFAULT_ROOT, help='Model registry directory')
     
     args = parser.parse_args()
     
-    predictor = PotholePredictor(args.checkpoint)
+    cache = PredictionCache(sqlite_path=args.cache) if args.cache else None
+    predictor = PotholePredictor(args.checkpoint, cache=cache, backend=args.backend, registry_dir=args.registry)
     predictor.confidence_threshold = args.threshold
     
     prediction, confidence, is_valid = predictor.predict(args.image_path)
@@ -0,0 +1,99 @@
+import os
+import torch
+import numpy as np
+from src.models.model import build_model
+
+BACKENDS = ('eager', 'torchscript', 'onnx')
+
+
+def default_device():
+    return torch.device('mps' if torch.backends.mps.is_available() else 'cuda' if torch.cuda.is_available() else 'cpu')
+
+
+def _load_checkpoint(checkpoint_path, device, mmap):
+    if mmap:
+        try:
+            return torch.load(checkpoint_path, map_location=device, mmap=True)
+        except (RuntimeError, TypeError):
+            # Legacy (non-zip) checkpoints and old PyTorch releases cannot be memory-mapped
+            pass
+    return torch.load(checkpoint_path, map_location=device)
+
+
+def load_eager(checkpoint_path, device, num_classes=4, mmap=None):
+    """
+    Build the checkpoint's architecture (ResNet18 unless it records another) and load its weights
+
+    On CPU the checkpoint is memory-mapped and its tensors become the model's
+    parameters (load_state_dict(assign=True)) rather than being copied into
+    freshly allocated ones. The weights then live in read-only page cache that
+    forked workers, and other processes serving the same file, share.
+    """
+    device = torch.device(device)
+    if mmap is None:
+        mmap = device.type == 'cpu'
+    checkpoint = _load_checkpoint(checkpoint_path, device, mmap)
+    # train.py saves 'model_state'; older checkpoints used 'model_state_dict'
+    state = checkpoint.get('model_state', checkpoint.get('model_state_dict'))
+    model = build_model(checkpoint.get('arch', 'resnet18'), num_classes=num_classes, pretrained=False)
+    model.load_state_dict(state, assign=mmap)
+    model.to(device)
+    model.eval()
+    return model
+
+
+def load_torchscript(artifact_path, device):
+    model = torch.jit.load(artifact_path, map_location=device)
+    model.eval()
+    return model
+
+
+class OnnxRuntimeModel:
+    """
+    Callable wrapper around an ONNX Runtime session.
+
+    Takes and returns torch tensors so it can stand in for the eager model.
+    ONNX Runtime is an optional dependency (pip install onnxruntime).
+    """
+
+    def __init__(self, artifact_path, intra_op_threads=0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError('The onnx backend requires onnxruntime (pip install onnxruntime)') from e
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(artifact_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, x):
+        inputs = x.detach().cpu().numpy().astype(np.float32, copy=False)
+        outputs = self.session.run(None, {self.input_name: inputs})[0]
+        return torch.from_numpy(outputs)
+
+
+def load_inference_model(path, backend='eager', device=None, intra_op_threads=0):
+    """
+    Load a model for serving.
+
+    Args:
+        path: training checkpoint for 'eager', exported artifact otherwise
+        backend: one of BACKENDS
+        intra_op_threads: ONNX Runtime thread count (0: its default); torch
+            backends use torch.set_num_threads instead
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {BACKENDS}")
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    device = device or default_device()
+    if backend == 'torchscript':
+        return load_torchscript(path, device)
+    if backend == 'onnx':
+        return OnnxRuntimeModel(path, intra_op_threads=intra_op_threads)
+    return load_eager(path, device)
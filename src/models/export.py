@@ -0,0 +1,118 @@
+"""
+Export a training checkpoint to a compiled inference artifact.
+
+    python -m src.models.export --checkpoint checkpoints/best.pt --format torchscript --out checkpoints/best.ts
+    python -m src.models.export --checkpoint checkpoints/best.pt --format onnx --out checkpoints/best.onnx
+
+The exported model is checked against eager PyTorch on random inputs and the
+command exits non-zero if any logit differs by more than --atol. A CPU
+latency/throughput comparison is printed afterwards.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+import torch
+
+from src.models.backends import OnnxRuntimeModel, load_eager, load_torchscript
+
+
+def export_torchscript(model, out_path: str, image_size: int = 224) -> str:
+    example = torch.randn(1, 3, image_size, image_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+        traced = torch.jit.freeze(traced.eval())
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    traced.save(out_path)
+    return out_path
+
+
+def export_onnx(model, out_path: str, image_size: int = 224, opset: int = 17) -> str:
+    example = torch.randn(1, 3, image_size, image_size)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    torch.onnx.export(
+        model,
+        example,
+        out_path,
+        input_names=["images"],
+        output_names=["logits"],
+        dynamic_axes={"images": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+        dynamo=False,
+    )
+    return out_path
+
+
+def max_abs_diff(reference, candidate, batch_sizes=(1, 4), image_size: int = 224) -> float:
+    """Largest absolute logit difference between two models on random inputs."""
+    worst = 0.0
+    torch.manual_seed(0)
+    with torch.no_grad():
+        for n in batch_sizes:
+            x = torch.randn(n, 3, image_size, image_size)
+            diff = (reference(x).float() - candidate(x).float()).abs().max().item()
+            worst = max(worst, diff)
+    return worst
+
+
+def benchmark(model, batch_size: int = 1, iterations: int = 30, warmup: int = 5, image_size: int = 224) -> Dict[str, float]:
+    """Time forward passes on CPU. Returns latency percentiles (ms) and images/s."""
+    x = torch.randn(batch_size, 3, image_size, image_size)
+    timings: List[float] = []
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(x)
+        for _ in range(iterations):
+            start = time.perf_counter()
+            model(x)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return {
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "images_per_s": batch_size / (sum(timings) / len(timings)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a checkpoint to TorchScript or ONNX")
+    parser.add_argument("--checkpoint", default="checkpoints/best.pt")
+    parser.add_argument("--format", choices=["torchscript", "onnx"], default="torchscript")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--image_size", type=int, default=224)
+    parser.add_argument("--atol", type=float, default=1e-3, help="Max allowed logit difference vs eager")
+    parser.add_argument("--bench_iterations", type=int, default=30, help="0 skips the benchmark")
+    parser.add_argument("--bench_batch_sizes", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    device = torch.device("cpu")
+    eager = load_eager(args.checkpoint, device)
+
+    if args.format == "torchscript":
+        export_torchscript(eager, args.out, args.image_size)
+        compiled = load_torchscript(args.out, device)
+    else:
+        export_onnx(eager, args.out, args.image_size)
+        compiled = OnnxRuntimeModel(args.out)
+    print(f"Exported {args.format} artifact to {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB)")
+
+    diff = max_abs_diff(eager, compiled, image_size=args.image_size)
+    print(f"Max abs logit difference vs eager: {diff:.2e} (atol {args.atol:.0e})")
+    if diff > args.atol:
+        print("Compiled outputs do not match eager within tolerance; do not deploy this artifact.")
+        sys.exit(1)
+
+    if args.bench_iterations:
+        print(f"\n{'backend':<12} {'batch':>5} {'p50 ms':>9} {'p95 ms':>9} {'img/s':>9}")
+        for batch_size in args.bench_batch_sizes:
+            for name, model in (("eager", eager), (args.format, compiled)):
+                r = benchmark(model, batch_size, args.bench_iterations, image_size=args.image_size)
+                print(f"{name:<12} {batch_size:>5} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['images_per_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from functools import partial
 from typing import Tuple
 import torch
 import torch.nn as nn
@@ -30,3 +31,98 @@ class PotholeSeverityModel(nn.Module):
     def create(cls, num_classes=4, pretrained=True):
         """Factory method to create model instance"""
         return cls(num_classes=num_classes, pretrained=pretrained)
+
+
+class PotholeScreeningModel(nn.Module):
+    """
+    Small CNN used as the first stage of the inference cascade.
+    
+    Four strided conv blocks and a linear head, roughly 1/40 of ResNet18's
+    FLOPs at 224x224. It only has to settle the obvious cases; anything it is
+    unsure about is passed on to PotholeSeverityModel.
+    """
+    def __init__(self, num_classes=4, pretrained=False):
+        super(PotholeScreeningModel, self).__init__()
+        
+        layers = []
+        in_channels = 3
+        for out_channels in (16, 32, 64, 128):
+            layers += [
+                nn.Conv2d(in_channels, out_channels, kernel_size=3, stride=2, padding=1, bias=False),
+                nn.BatchNorm2d(out_channels),
+                nn.ReLU(inplace=True),
+            ]
+            in_channels = out_channels
+        self.features = nn.Sequential(*layers)
+        self.pool = nn.AdaptiveAvgPool2d(1)
+        self.classifier = nn.Sequential(
+            nn.Dropout(0.2),
+            nn.Linear(in_channels, num_classes)
+        )
+        
+    def forward(self, x):
+        x = self.pool(self.features(x)).flatten(1)
+        return self.classifier(x)
+    
+    @classmethod
+    def create(cls, num_classes=4, pretrained=False):
+        """Factory method to create model instance (there are no pretrained weights)"""
+        return cls(num_classes=num_classes, pretrained=pretrained)
+
+
+# Lightweight torchvision backbones for distilled students: name -> dotted path of the final Linear layer
+STUDENT_BACKBONES = {
+    'mobilenet_v3_small': 'classifier.3',
+    'mobilenet_v3_large': 'classifier.3',
+    'shufflenet_v2_x0_5': 'fc',
+    'shufflenet_v2_x1_0': 'fc',
+    'efficientnet_b0': 'classifier.1',
+}
+
+
+class PotholeStudentModel(nn.Module):
+    """
+    Compact torchvision backbone with a new classification layer, trained by
+    distillation from PotholeSeverityModel (train.py --teacher).
+    """
+    def __init__(self, backbone='mobilenet_v3_small', num_classes=4, pretrained=True):
+        super(PotholeStudentModel, self).__init__()
+        if backbone not in STUDENT_BACKBONES:
+            raise ValueError(f"Unknown student backbone {backbone!r}; expected one of {sorted(STUDENT_BACKBONES)}")
+        
+        self.backbone = getattr(models, backbone)(weights='DEFAULT' if pretrained else None)
+        
+        # Replace the ImageNet classifier with one for our classes
+        *parents, last = STUDENT_BACKBONES[backbone].split('.')
+        head_parent = self.backbone
+        for name in parents:
+            head_parent = getattr(head_parent, name)
+        old_head = head_parent[int(last)] if last.isdigit() else getattr(head_parent, last)
+        new_head = nn.Linear(old_head.in_features, num_classes)
+        if last.isdigit():
+            head_parent[int(last)] = new_head
+        else:
+            setattr(head_parent, last, new_head)
+        
+    def forward(self, x):
+        return self.backbone(x)
+    
+    @classmethod
+    def create(cls, backbone='mobilenet_v3_small', num_classes=4, pretrained=True):
+        """Factory method to create model instance"""
+        return cls(backbone=backbone, num_classes=num_classes, pretrained=pretrained)
+
+
+# Architectures selectable with train.py --arch and recorded in checkpoints as "arch"
+ARCHITECTURES = {
+    'resnet18': PotholeSeverityModel.create,
+    'screen': PotholeScreeningModel.create,
+}
+ARCHITECTURES.update({name: partial(PotholeStudentModel.create, name) for name in STUDENT_BACKBONES})
+
+
+def build_model(arch='resnet18', num_classes=4, pretrained=True):
+    """Create a model by architecture name"""
+    if arch not in ARCHITECTURES:
+        raise ValueError(f"Unknown architecture {arch!r}; expected one of {sorted(ARCHITECTURES)}")
+    return ARCHITECTURES[arch](num_classes=num_classes, pretrained=pretrained)
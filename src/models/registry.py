@@ -0,0 +1,209 @@
+"""
+Versioned model registry.
+
+Each published model gets its own directory with the artifact and a
+metadata.json. A plain-text ACTIVE file names the version to serve. Publishing
+and activation both use os.replace, so readers only ever see a complete
+version and a complete pointer.
+
+    model_registry/
+        ACTIVE
+        20261017-120000-3f2a9c1b7d4e/
+            model.pt
+            metadata.json
+
+Usage:
+    python -m src.models.registry publish checkpoints/best.pt --activate
+    python -m src.models.registry publish checkpoints/best.ts --backend torchscript
+    python -m src.models.registry activate 20261017-120000-3f2a9c1b7d4e
+    python -m src.models.registry list
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from src.utils.prediction_cache import checkpoint_version
+
+DEFAULT_ROOT = "model_registry"
+DEFAULT_CHECKPOINT = "checkpoints/best.pt"
+ARTIFACT_NAMES = {"eager": "model.pt", "torchscript": "model.ts", "onnx": "model.onnx"}
+CLASS_NAMES = ["good", "minor", "moderate", "severe"]
+
+
+def _write_atomic(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _checkpoint_metadata(path):
+    """Architecture, class names and validation accuracy recorded by train.py, if readable"""
+    import torch
+
+    try:
+        checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+    except Exception:
+        return {}
+    if not isinstance(checkpoint, dict):
+        return {}
+    info = {"arch": checkpoint.get("arch", "resnet18")}
+    if "class_names" in checkpoint:
+        info["class_names"] = list(checkpoint["class_names"])
+    if "best_val_acc" in checkpoint:
+        info["metrics"] = {"best_val_acc": float(checkpoint["best_val_acc"])}
+    return info
+
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def _version_dir(self, version):
+        return os.path.join(self.root, version)
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, "metadata.json"))
+        )
+
+    def metadata(self, version):
+        with open(os.path.join(self._version_dir(version), "metadata.json")) as f:
+            metadata = json.load(f)
+        metadata["path"] = os.path.join(self._version_dir(version), metadata["artifact"])
+        return metadata
+
+    def active_version(self):
+        """Name of the active version, or None if nothing has been activated"""
+        try:
+            with open(os.path.join(self.root, "ACTIVE")) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def active(self):
+        """Metadata (including the artifact 'path') of the active version, or None"""
+        version = self.active_version()
+        return self.metadata(version) if version else None
+
+    def publish(self, artifact_path, backend="eager", version=None, metrics=None, activate=False):
+        """
+        Copy an artifact into the registry as a new version.
+
+        Metrics default to what the artifact records itself: best_val_acc from a
+        training checkpoint, or the <artifact>.json report written by quantize.py.
+
+        Returns:
+            str: the new version name
+        """
+        from src.utils.preprocessing import IMAGE_SIZE
+
+        if backend not in ARTIFACT_NAMES:
+            raise ValueError(f"Unknown backend {backend!r}; expected one of {tuple(ARTIFACT_NAMES)}")
+        if not os.path.isfile(artifact_path):
+            raise FileNotFoundError(artifact_path)
+        digest = checkpoint_version(artifact_path)
+        version = version or f"{time.strftime('%Y%m%d-%H%M%S')}-{digest}"
+        if os.path.exists(self._version_dir(version)):
+            raise FileExistsError(f"Version {version} already exists")
+
+        metadata = {
+            "version": version,
+            "backend": backend,
+            "artifact": ARTIFACT_NAMES[backend],
+            "sha256": digest,
+            "class_names": CLASS_NAMES,
+            "input_size": IMAGE_SIZE,
+            "metrics": {},
+            "source": os.path.abspath(artifact_path),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        if backend == "eager":
+            metadata.update(_checkpoint_metadata(artifact_path))
+        report_path = artifact_path + ".json"
+        if os.path.isfile(report_path):
+            with open(report_path) as f:
+                metadata["metrics"].update(json.load(f))
+        if metrics:
+            metadata["metrics"].update(metrics)
+
+        # Stage the whole version next to its final location, then rename it into place
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.root, prefix=".publish-")
+        try:
+            shutil.copy2(artifact_path, os.path.join(staging, metadata["artifact"]))
+            with open(os.path.join(staging, "metadata.json"), "w") as f:
+                json.dump(metadata, f, indent=2)
+            os.replace(staging, self._version_dir(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Point ACTIVE at an existing version; serving processes pick it up on their next reload check"""
+        if version not in self.versions():
+            raise KeyError(f"Unknown model version {version!r}")
+        _write_atomic(os.path.join(self.root, "ACTIVE"), version + "\n")
+
+
+def resolve_model(root=DEFAULT_ROOT, default_path=DEFAULT_CHECKPOINT, default_backend="eager"):
+    """
+    Pick the model to serve: the registry's active version, falling back to a plain checkpoint.
+
+    Returns:
+        tuple: (artifact_path, backend, version)
+    """
+    metadata = ModelRegistry(root).active()
+    if metadata is not None:
+        return metadata["path"], metadata["backend"], metadata["version"]
+    version = checkpoint_version(default_path) if os.path.isfile(default_path) else ""
+    return default_path, default_backend, version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry")
+    parser.add_argument("--root", default=os.environ.get("AWAAZ_MODEL_REGISTRY", DEFAULT_ROOT))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    publish = sub.add_parser("publish", help="Add an artifact as a new version")
+    publish.add_argument("artifact")
+    publish.add_argument("--backend", choices=sorted(ARTIFACT_NAMES), default="eager")
+    publish.add_argument("--version", default=None)
+    publish.add_argument("--activate", action="store_true")
+
+    activate = sub.add_parser("activate", help="Make a version the one being served")
+    activate.add_argument("version")
+
+    sub.add_parser("list", help="List versions, marking the active one")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "publish":
+        version = registry.publish(args.artifact, backend=args.backend, version=args.version, activate=args.activate)
+        print(f"Published {version}" + (" (active)" if args.activate else ""))
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"Activated {args.version}")
+    else:
+        active = registry.active_version()
+        for version in registry.versions():
+            metadata = registry.metadata(version)
+            marker = "*" if version == active else " "
+            print(f"{marker} {version}  {metadata['backend']:<11} {json.dumps(metadata.get('metrics', {}))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Post-training INT8 quantization with an accuracy gate.
+
+	python -m src.train.quantize --data_dir dataset --checkpoint checkpoints/best.pt --out checkpoints/best.int8.pt
+
+Static mode calibrates activation ranges on the validation split that train.py
+uses and quantizes convolutions and linear layers. Dynamic mode only quantizes
+the linear head and needs no calibration. The quantized model is scored on the
+test split and is only written to --out if its accuracy is no more than
+--max_accuracy_drop below the fp32 model. The artifact is TorchScript, so serve
+it with INFERENCE_BACKEND=torchscript and INFERENCE_MODEL_PATH=<out>. Quantized
+kernels run on CPU only.
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+
+from src.data.dataset import PotholeImageDataset, CLASS_NAMES
+from src.models.backends import load_eager
+from src.models.export import benchmark
+
+
+def quantize_dynamic(model: nn.Module) -> nn.Module:
+	from torch.ao.quantization import quantize_dynamic as _quantize_dynamic
+	return _quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model: nn.Module, calibration_loader, max_batches: int, image_size: int = 224) -> nn.Module:
+	from torch.ao.quantization import get_default_qconfig_mapping
+	from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+	engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "fbgemm"
+	torch.backends.quantized.engine = engine
+	example = (torch.randn(1, 3, image_size, image_size),)
+	prepared = prepare_fx(copy.deepcopy(model).eval(), get_default_qconfig_mapping(engine), example_inputs=example)
+	with torch.no_grad():
+		for i, (images, _) in enumerate(calibration_loader):
+			if i >= max_batches:
+				break
+			prepared(images)
+	return convert_fx(prepared)
+
+
+def evaluate_accuracy(model, loader) -> float:
+	correct = 0
+	n = 0
+	with torch.no_grad():
+		for images, labels in loader:
+			preds = model(images).argmax(dim=1)
+			correct += (preds == labels).sum().item()
+			n += labels.size(0)
+	return correct / max(n, 1)
+
+
+def save_torchscript(model, path: str, image_size: int = 224) -> None:
+	example = torch.randn(1, 3, image_size, image_size)
+	with torch.no_grad():
+		traced = torch.jit.freeze(torch.jit.trace(model, example).eval())
+	traced.save(path)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Quantize a checkpoint to INT8 behind an accuracy gate")
+	parser.add_argument("--data_dir", type=str, default="dataset")
+	parser.add_argument("--checkpoint", type=str, default="checkpoints/best.pt")
+	parser.add_argument("--out", type=str, default="checkpoints/best.int8.pt")
+	parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+	parser.add_argument("--max_accuracy_drop", type=float, default=0.01, help="Absolute test accuracy loss allowed")
+	parser.add_argument("--calibration_batches", type=int, default=20)
+	parser.add_argument("--batch_size", type=int, default=32)
+	parser.add_argument("--image_size", type=int, default=224)
+	args = parser.parse_args()
+
+	device = torch.device("cpu")
+	model = load_eager(args.checkpoint, device, num_classes=len(CLASS_NAMES))
+
+	val_ds = PotholeImageDataset(args.data_dir, split="val", image_size=args.image_size, augment=False)
+	test_ds = PotholeImageDataset(args.data_dir, split="test", image_size=args.image_size, augment=False)
+	val_loader = DataLoader(val_ds, batch_size=args.batch_size, shuffle=False, num_workers=2)
+	test_loader = DataLoader(test_ds, batch_size=args.batch_size, shuffle=False, num_workers=2)
+
+	if args.mode == "static":
+		print(f"Calibrating on up to {args.calibration_batches} validation batches...")
+		quantized = quantize_static(model, val_loader, args.calibration_batches, args.image_size)
+	else:
+		quantized = quantize_dynamic(model)
+
+	fp32_acc = evaluate_accuracy(model, test_loader)
+	int8_acc = evaluate_accuracy(quantized, test_loader)
+	drop = fp32_acc - int8_acc
+	print(f"Test accuracy fp32 {fp32_acc:.4f} | int8 {int8_acc:.4f} | drop {drop:+.4f} (max {args.max_accuracy_drop:.4f})")
+
+	fp32_ms = benchmark(model, image_size=args.image_size)["p50_ms"]
+	int8_ms = benchmark(quantized, image_size=args.image_size)["p50_ms"]
+
+	out_dir = os.path.dirname(args.out) or "."
+	os.makedirs(out_dir, exist_ok=True)
+	fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+	os.close(fd)
+	save_torchscript(quantized, tmp_path, args.image_size)
+	int8_mb = os.path.getsize(tmp_path) / 1e6
+	# Compare like with like: the training checkpoint also holds optimizer and scheduler state
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		fp32_path = os.path.join(tmp_dir, "fp32.pt")
+		save_torchscript(model, fp32_path, args.image_size)
+		fp32_mb = os.path.getsize(fp32_path) / 1e6
+
+	report = {
+		"mode": args.mode,
+		"checkpoint": args.checkpoint,
+		"fp32_test_accuracy": fp32_acc,
+		"int8_test_accuracy": int8_acc,
+		"accuracy_drop": drop,
+		"max_accuracy_drop": args.max_accuracy_drop,
+		"fp32_p50_ms": fp32_ms,
+		"int8_p50_ms": int8_ms,
+		"speedup": fp32_ms / int8_ms if int8_ms else None,
+		"fp32_size_mb": fp32_mb,
+		"int8_size_mb": int8_mb,
+		"published": drop <= args.max_accuracy_drop,
+	}
+	print(f"Latency p50 {fp32_ms:.2f} ms -> {int8_ms:.2f} ms ({report['speedup']:.2f}x) | size {fp32_mb:.1f} MB -> {int8_mb:.1f} MB")
+
+	if not report["published"]:
+		os.remove(tmp_path)
+		print("Accuracy gate failed; quantized model not published.")
+		print(json.dumps(report, indent=2))
+		sys.exit(1)
+
+	# Atomic publish so a serving process never reads a half-written artifact
+	os.replace(tmp_path, args.out)
+	with open(args.out + ".json", "w") as f:
+		json.dump(report, f, indent=2)
+	print(f"Published {args.out}")
+
+
+if __name__ == "__main__":
+	main()
@@ -3,6 +3,7 @@ import argparse
 from typing import Dict, List
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 from torch.utils.data import DataLoader, WeightedRandomSampler
 from torch.optim import AdamW
 from torch.optim.lr_scheduler import CosineAnnealingLR
@@ -11,7 +12,8 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 
 from src.data.dataset import PotholeImageDataset, CLASS_NAMES
-from src.models.model import PotholeSeverityModel
+from src.models.model import ARCHITECTURES, build_model
+from src.models.backends import load_eager
 
 
 def accuracy(logits: torch.Tensor, targets: torch.Tensor) -> float:
@@ -46,7 +48,22 @@ def build_weighted_sampler(labels: List[int]) -> WeightedRandomSampler:
 	return WeightedRandomSampler(weights, num_samples=len(labels), replacement=True)
 
 
-def train_one_epoch(model, loader, criterion, optimizer, device):
+def distillation_loss(student_logits, teacher_logits, hard_loss, alpha: float, temperature: float):
+	# Hinton et al.: KL between temperature-softened distributions, scaled by T^2
+	# so its gradients stay comparable to the hard-label loss as T changes
+	soft_loss = F.kl_div(
+		F.log_softmax(student_logits / temperature, dim=1),
+		F.softmax(teacher_logits / temperature, dim=1),
+		reduction="batchmean",
+	) * (temperature ** 2)
+	return alpha * soft_loss + (1.0 - alpha) * hard_loss
+
+
+def count_parameters(model) -> int:
+	return sum(p.numel() for p in model.parameters())
+
+
+def train_one_epoch(model, loader, criterion, optimizer, device, teacher=None, alpha=0.7, temperature=4.0):
 	model.train()
 	running_loss = 0.0
 	running_acc = 0.0
@@ -57,6 +74,10 @@ def train_one_epoch(model, loader, criterion, optimizer, device):
 		optimizer.zero_grad()
 		logits = model(images)
 		loss = criterion(logits, labels)
+		if teacher is not None:
+			with torch.no_grad():
+				teacher_logits = teacher(images)
+			loss = distillation_loss(logits, teacher_logits, loss, alpha, temperature)
 		loss.backward()
 		optimizer.step()
 		running_loss += loss.item() * images.size(0)
@@ -70,9 +91,9 @@ def evaluate(model, loader, criterion, device, class_names=None, save_cm=False,
 	running_loss = 0.0
 	running_acc = 0.0
 	n = 0
-    all_preds = []
-    all_labels = []
-    
+	all_preds = []
+	all_labels = []
+
 	with torch.no_grad():
 		for images, labels in loader:
 			images = images.to(device)
@@ -82,59 +103,63 @@ def evaluate(model, loader, criterion, device, class_names=None, save_cm=False,
 			running_loss += loss.item() * images.size(0)
 			running_acc += accuracy(logits, labels) * images.size(0)
 			n += images.size(0)
-            
-            # Collect predictions for detailed evaluation
-            preds = logits.argmax(dim=1)
-            all_preds.extend(preds.cpu().numpy())
-            all_labels.extend(labels.cpu().numpy())
-    
-    # Generate classification report
-    if class_names:
-        print("\nClassification Report:")
-        print(classification_report(all_labels, all_preds, target_names=class_names))
-        
-        # Generate confusion matrix
-        if save_cm:
-            cm = confusion_matrix(all_labels, all_preds)
-            plt.figure(figsize=(8, 6))
-            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                       xticklabels=class_names, yticklabels=class_names)
-            plt.title('Confusion Matrix' + (f' - Epoch {epoch}' if epoch else ''))
-            plt.ylabel('True Label')
-            plt.xlabel('Predicted Label')
-            plt.tight_layout()
-            
-            # Create logs directory if it doesn't exist
-            os.makedirs('logs', exist_ok=True)
-            
-            if epoch:
-                plt.savefig(f'logs/confusion_matrix_epoch_{epoch}.png', dpi=150, bbox_inches='tight')
-            else:
-                plt.savefig('logs/Final_confusion_matrix_last.png', dpi=150, bbox_inches='tight')
-            plt.close()
-    
+
+			# Collect predictions for detailed evaluation
+			preds = logits.argmax(dim=1)
+			all_preds.extend(preds.cpu().numpy())
+			all_labels.extend(labels.cpu().numpy())
+
+	# Generate classification report
+	if class_names:
+		print("\nClassification Report:")
+		print(classification_report(all_labels, all_preds, target_names=class_names))
+
+		# Generate confusion matrix
+		if save_cm:
+			cm = confusion_matrix(all_labels, all_preds)
+			plt.figure(figsize=(8, 6))
+			sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
+					   xticklabels=class_names, yticklabels=class_names)
+			plt.title('Confusion Matrix' + (f' - Epoch {epoch}' if epoch else ''))
+			plt.ylabel('True Label')
+			plt.xlabel('Predicted Label')
+			plt.tight_layout()
+
+			# Create logs directory if it doesn't exist
+			os.makedirs('logs', exist_ok=True)
+
+			if epoch:
+				plt.savefig(f'logs/confusion_matrix_epoch_{epoch}.png', dpi=150, bbox_inches='tight')
+			else:
+				plt.savefig('logs/Final_confusion_matrix_last.png', dpi=150, bbox_inches='tight')
+			plt.close()
+
 	return running_loss / n, running_acc / n
 
 
 def main():
 	parser = argparse.ArgumentParser()
-    parser.add_argument("--data_dir", type=str, default="dataset")
-    parser.add_argument("--epochs", type=int, default=20)
+	parser.add_argument("--data_dir", type=str, default="dataset")
+	parser.add_argument("--epochs", type=int, default=20)
 	parser.add_argument("--batch_size", type=int, default=32)
 	parser.add_argument("--lr", type=float, default=3e-4)
 	parser.add_argument("--checkpoint_dir", type=str, default="checkpoints")
 	parser.add_argument("--resume", type=str, default="")
 	parser.add_argument("--no_pretrained", action="store_true")
 	parser.add_argument("--no_balanced", action="store_true", help="Disable class-balanced sampling and loss")
+	parser.add_argument("--arch", choices=sorted(ARCHITECTURES), default="resnet18", help="'screen' trains the small first-stage cascade model")
+	parser.add_argument("--teacher", type=str, default="", help="Checkpoint to distill from (e.g. checkpoints/best.pt)")
+	parser.add_argument("--distill_alpha", type=float, default=0.7, help="Weight of the soft-target loss when distilling")
+	parser.add_argument("--distill_temperature", type=float, default=4.0, help="Softmax temperature for teacher and student logits")
 	args = parser.parse_args()
 
 	device = torch.device("mps" if torch.backends.mps.is_available() else ("cuda" if torch.cuda.is_available() else "cpu"))
 	print(f"Using device: {device}")
 
-    # Create datasets including test set
+	# Create datasets including test set
 	train_ds = PotholeImageDataset(args.data_dir, split="train", image_size=224, augment=True)
 	val_ds = PotholeImageDataset(args.data_dir, split="val", image_size=224, augment=False)
-    test_ds = PotholeImageDataset(args.data_dir, split="test", image_size=224, augment=False)
+	test_ds = PotholeImageDataset(args.data_dir, split="test", image_size=224, augment=False)
 
 	# Collect labels for balancing
 	train_labels = [lbl for (_, lbl) in train_ds.samples]
@@ -148,11 +173,19 @@ def main():
 		class_weights = compute_class_weights(train_labels, num_classes=len(CLASS_NAMES))
 
 	val_loader = DataLoader(val_ds, batch_size=args.batch_size, shuffle=False, num_workers=2)
-    test_loader = DataLoader(test_ds, batch_size=args.batch_size, shuffle=False, num_workers=2)
+	test_loader = DataLoader(test_ds, batch_size=args.batch_size, shuffle=False, num_workers=2)
 
-	model = PotholeSeverityModel.create(num_classes=len(CLASS_NAMES), pretrained=not args.no_pretrained)
+	model = build_model(args.arch, num_classes=len(CLASS_NAMES), pretrained=not args.no_pretrained)
 	model.to(device)
 
+	teacher = None
+	if args.teacher:
+		teacher = load_eager(args.teacher, device, num_classes=len(CLASS_NAMES))
+		for p in teacher.parameters():
+			p.requires_grad_(False)
+		print(f"Distilling from {args.teacher}: teacher {count_parameters(teacher):,} params, "
+			f"student ({args.arch}) {count_parameters(model):,} params")
+
 	criterion = nn.CrossEntropyLoss(weight=class_weights.to(device))
 	optimizer = AdamW(model.parameters(), lr=args.lr)
 	scheduler = CosineAnnealingLR(optimizer, T_max=args.epochs)
@@ -168,11 +201,14 @@ def main():
 		best_val_acc = ckpt.get("best_val_acc", 0.0)
 		print(f"Resumed from {args.resume} at epoch {start_epoch}")
 
-    print(f"Training with {len(CLASS_NAMES)} classes: {CLASS_NAMES}")
-    print(f"Class weights: {class_weights}")
+	print(f"Training with {len(CLASS_NAMES)} classes: {CLASS_NAMES}")
+	print(f"Class weights: {class_weights}")
 
 	for epoch in range(start_epoch, args.epochs):
-		tr_loss, tr_acc = train_one_epoch(model, train_loader, criterion, optimizer, device)
+		tr_loss, tr_acc = train_one_epoch(
+			model, train_loader, criterion, optimizer, device,
+			teacher=teacher, alpha=args.distill_alpha, temperature=args.distill_temperature,
+		)
 		val_loss, val_acc = evaluate(model, val_loader, criterion, device)
 
 		scheduler.step()
@@ -185,7 +221,9 @@ def main():
 			"optimizer_state": optimizer.state_dict(),
 			"scheduler_state": scheduler.state_dict(),
 			"best_val_acc": best_val_acc,
-            "class_names": CLASS_NAMES,
+			"class_names": CLASS_NAMES,
+			"arch": args.arch,
+			"teacher": args.teacher or None,
 		}
 		save_checkpoint(state, os.path.join(args.checkpoint_dir, "last.pt"))
 
@@ -193,14 +231,14 @@ def main():
 			best_val_acc = val_acc
 			state["best_val_acc"] = best_val_acc
 			save_checkpoint(state, os.path.join(args.checkpoint_dir, "best.pt"))
-            print(f"New best validation accuracy: {best_val_acc:.4f}")
+			print(f"New best validation accuracy: {best_val_acc:.4f}")
 
 	print("Training complete. Best Val Acc:", best_val_acc)
-    
-    # Final evaluation on test set with detailed metrics
-    print("\nEvaluating on test set...")
-    test_loss, test_acc = evaluate(model, test_loader, criterion, device, CLASS_NAMES, save_cm=True)
-    print(f"Test Accuracy: {test_acc:.4f}")
+
+	# Final evaluation on test set with detailed metrics
+	print("\nEvaluating on test set...")
+	test_loss, test_acc = evaluate(model, test_loader, criterion, device, CLASS_NAMES, save_cm=True)
+	print(f"Test Accuracy: {test_acc:.4f}")
 
 
 if __name__ == "__main__":
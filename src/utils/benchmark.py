@@ -0,0 +1,50 @@
+import io
+import random
+import time
+from typing import Callable, Dict, List
+
+from PIL import Image, ImageDraw, ImageFilter
+
+
+def synthetic_jpeg(width: int, height: int, quality: int = 90, seed: int = 0) -> bytes:
+	"""
+	Encode a road-like test image: a gradient with dark blotches and noise.
+
+	Photographic content matters for JPEG decode cost, so a flat colour would
+	understate it.
+	"""
+	rng = random.Random(seed)
+	base = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+	draw = ImageDraw.Draw(base)
+	for _ in range(40):
+		x, y = rng.randrange(width), rng.randrange(height)
+		r = rng.randrange(max(width, height) // 40 + 1, max(width, height) // 8 + 2)
+		shade = rng.randrange(20, 90)
+		draw.ellipse((x - r, y - r, x + r, y + r), fill=(shade, shade, shade))
+	noise = Image.effect_noise((width, height), 40).convert("RGB")
+	image = Image.blend(base, noise, 0.25).filter(ImageFilter.SMOOTH)
+	buf = io.BytesIO()
+	image.save(buf, format="JPEG", quality=quality)
+	return buf.getvalue()
+
+
+def time_call(fn: Callable[[], object], iterations: int = 20, warmup: int = 2) -> Dict[str, float]:
+	"""Run fn repeatedly and return latency percentiles in milliseconds."""
+	for _ in range(warmup):
+		fn()
+	timings: List[float] = []
+	for _ in range(iterations):
+		start = time.perf_counter()
+		fn()
+		timings.append((time.perf_counter() - start) * 1000)
+	return summarize(timings)
+
+
+def summarize(timings_ms: List[float]) -> Dict[str, float]:
+	"""Mean and p50/p95 of a list of latencies in milliseconds."""
+	timings = sorted(timings_ms)
+	return {
+		"mean_ms": sum(timings) / len(timings),
+		"p50_ms": timings[len(timings) // 2],
+		"p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+	}
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def image_key(image_bytes: bytes, model_version: str) -> str:
+	"""Cache key for an encoded image under a given model version."""
+	digest = hashlib.sha256(image_bytes).hexdigest()
+	return f"{model_version}:{digest}"
+
+
+# (path, inode, size, mtime_ns) -> version, so periodic reload checks do not rehash an unchanged checkpoint
+_versions: Dict[tuple, str] = {}
+_versions_lock = threading.Lock()
+
+
+def checkpoint_version(checkpoint_path: str) -> str:
+	"""
+	Short content hash of a checkpoint file, used as the model version in cache keys.
+
+	The hash is only recomputed when the file is replaced or its size or modification time changes.
+	"""
+	stat = os.stat(checkpoint_path)
+	key = (os.path.realpath(checkpoint_path), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+	with _versions_lock:
+		version = _versions.get(key)
+	if version is not None:
+		return version
+	h = hashlib.sha256()
+	with open(checkpoint_path, "rb") as f:
+		for chunk in iter(lambda: f.read(1024 * 1024), b""):
+			h.update(chunk)
+	version = h.hexdigest()[:12]
+	with _versions_lock:
+		# Forget older stats of the same file so the cache stays one entry per path
+		for stale in [k for k in _versions if k[0] == key[0]]:
+			del _versions[stale]
+		_versions[key] = version
+	return version
+
+
+class PredictionCache:
+	"""
+	Two-tier cache of model outputs keyed by image content and model version.
+
+	The memory tier is a bounded LRU. The optional disk tier is a SQLite file
+	that survives restarts and can be shared by processes on the same host.
+	Values must be JSON serialisable.
+	"""
+
+	def __init__(self, max_entries: int = 1024, sqlite_path: Optional[str] = None):
+		self.max_entries = max_entries
+		self.sqlite_path = sqlite_path
+		self._entries: "OrderedDict[str, Any]" = OrderedDict()
+		self._lock = threading.Lock()
+		self._conn = None
+		self.hits = 0
+		self.disk_hits = 0
+		self.misses = 0
+		if sqlite_path:
+			directory = os.path.dirname(sqlite_path)
+			if directory:
+				os.makedirs(directory, exist_ok=True)
+			self._conn = sqlite3.connect(sqlite_path, check_same_thread=False)
+			self._conn.execute(
+				"CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+			)
+			self._conn.commit()
+
+	def get(self, key: str) -> Optional[Any]:
+		with self._lock:
+			if key in self._entries:
+				self._entries.move_to_end(key)
+				self.hits += 1
+				return self._entries[key]
+			if self._conn is not None:
+				row = self._conn.execute("SELECT value FROM predictions WHERE key = ?", (key,)).fetchone()
+				if row is not None:
+					value = json.loads(row[0])
+					self._remember(key, value)
+					self.hits += 1
+					self.disk_hits += 1
+					return value
+			self.misses += 1
+			return None
+
+	def set(self, key: str, value: Any) -> None:
+		with self._lock:
+			self._remember(key, value)
+			if self._conn is not None:
+				self._conn.execute(
+					"INSERT OR REPLACE INTO predictions (key, value, created_at) VALUES (?, ?, ?)",
+					(key, json.dumps(value), time.time()),
+				)
+				self._conn.commit()
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+			if self._conn is not None:
+				self._conn.execute("DELETE FROM predictions")
+				self._conn.commit()
+
+	def stats(self) -> Dict[str, int]:
+		with self._lock:
+			return {
+				"hits": self.hits,
+				"disk_hits": self.disk_hits,
+				"misses": self.misses,
+				"entries": len(self._entries),
+			}
+
+	def _remember(self, key: str, value: Any) -> None:
+		if self.max_entries <= 0:
+			return
+		self._entries[key] = value
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
@@ -0,0 +1,50 @@
+"""
+Shared image preprocessing for every inference entry point.
+
+JPEGs are decoded in draft mode: libjpeg scales the DCT by 1/2, 1/4 or 1/8 while
+decoding, so a 12MP phone photo comes out at roughly the model resolution
+instead of being fully decoded and then thrown away by the resize. The
+torchvision transform is built once per size and reused.
+"""
+import io
+from functools import lru_cache
+
+from PIL import Image
+import torchvision.transforms as transforms
+
+IMAGE_SIZE = 224
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+@lru_cache(maxsize=None)
+def get_transform(image_size: int = IMAGE_SIZE):
+	"""Resize + normalise pipeline used by training-time evaluation and serving."""
+	return transforms.Compose([
+		transforms.Resize((image_size, image_size)),
+		transforms.ToTensor(),
+		transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
+	])
+
+
+def open_image(source, image_size: int = IMAGE_SIZE, draft: bool = True) -> Image.Image:
+	"""
+	Decode an image to RGB.
+
+	Args:
+		source: file path, encoded bytes, or a binary file-like object
+		image_size: target resolution; draft decoding never goes below it
+		draft: use reduced-resolution JPEG decoding
+	"""
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		source = io.BytesIO(source)
+	image = Image.open(source)
+	if draft and image.format == "JPEG":
+		# Picks the largest DCT scale that keeps both sides >= image_size
+		image.draft("RGB", (image_size, image_size))
+	return image.convert("RGB")
+
+
+def preprocess(source, image_size: int = IMAGE_SIZE, draft: bool = True):
+	"""Decode and transform an image into a normalised (3, H, W) tensor."""
+	return get_transform(image_size)(open_image(source, image_size, draft))